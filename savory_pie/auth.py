@@ -6,8 +6,12 @@ def authorization_adapter(field, ctx, source_dict, target_obj):
     Default adapter works on single field (non iterable)
     """
     name = field._compute_property(ctx)
+    target = field._get(target_obj)
+    if source_dict[name] == target:
+        # Unchanged, no need to convert either value
+        return name, target, target
     source = field.to_python_value(ctx, source_dict[name])
-    target = field.to_python_value(ctx, field._get(target_obj))
+    target = field.to_python_value(ctx, target)
     return name, source, target
 
 
@@ -40,6 +44,24 @@ def subobject_auth_adapter(field, ctx, source_dict, target_obj):
     return name, source, target
 
 
+def _relation_uris(field, ctx, source_uris, target_items):
+    """
+    Returns the sorted source_uris and the sorted URIs of the related
+    target_items.  An unchanged relation is recognized from the keys of the
+    target resources, building a single URI; otherwise every URI is built.
+    """
+    source = sorted(source_uris)
+    resources = [field._resource_class(target_item) for target_item in target_items]
+    if resources and len(resources) == len(source):
+        key = getattr(resources[0], 'key', None)
+        uri = ctx.build_resource_uri(resources[0])
+        if key and uri.endswith(key):
+            prefix = uri[:-len(key)]
+            if sorted(prefix + resource.key for resource in resources) == source:
+                return source, list(source)
+    return source, sorted(ctx.build_resource_uri(resource) for resource in resources)
+
+
 def uri_auth_adapter(field, ctx, source_dict, target_obj):
     """
     Authorization adapter for use in fields representing a 1 to many relationship.  Is used when you want to prevent
@@ -53,20 +75,17 @@ def uri_auth_adapter(field, ctx, source_dict, target_obj):
 
     if source_field and target_field:
         if isinstance(field, IterableField):
-            source = [source_field_item.get('resourceUri', None) for source_field_item in source_field]
-            target = [ctx.build_resource_uri(field._resource_class(target_item))
-                      for target_item in field.get_iterable(target_field)]
-            source.sort()
-            target.sort()
+            source, target = _relation_uris(
+                field,
+                ctx,
+                [source_field_item.get('resourceUri', None) for source_field_item in source_field],
+                field.get_iterable(target_field)
+            )
         elif isinstance(field, URIResourceField):
             source = source_field
             target = ctx.build_resource_uri(field._resource_class(target_field))
         elif isinstance(field, URIListResourceField):
-            source = source_field
-            target = [ctx.build_resource_uri(field._resource_class(target_item))
-                      for target_item in field.get_iterable(target_field)]
-            source.sort()
-            target.sort()
+            source, target = _relation_uris(field, ctx, source_field, field.get_iterable(target_field))
         else:
             raise TypeError('uri_auth_adapter can only be used with fields of type URIResourceField,' +
                             ' URIListResourceField or IterableField')
@@ -77,6 +96,19 @@ def uri_auth_adapter(field, ctx, source_dict, target_obj):
     return name, source, target
 
 
+def _is_write_granted(permission, ctx):
+    """
+    A permission whose is_write_authorized only ever defers to
+    has_permission(ctx) marks it with granted_by_has_permission; when the user
+    has the permission, the adapter does not need to run at all.  An override
+    of is_write_authorized is not marked, so it is always asked.
+    """
+    is_write_authorized = getattr(type(permission), 'is_write_authorized', None)
+    if not getattr(is_write_authorized, 'granted_by_has_permission', False):
+        return False
+    return permission.has_permission(ctx)
+
+
 class authorization(object):
     """
     Authorization decorator, takes a permission dictionary key and an adapter function
@@ -96,7 +128,7 @@ class authorization(object):
         """
         def inner(field, ctx, source_dict, target_obj):
             permission = field.permission
-            if permission:
+            if permission and not _is_write_granted(permission, ctx):
                 auth_adapter = getattr(permission, 'auth_adapter', None) or self.auth_adapter
                 name, source, target = auth_adapter(field, ctx, source_dict, target_obj)
                 if not permission.is_write_authorized(ctx, target_obj, source, target):
@@ -25,6 +25,12 @@ class APIContext(object):
         self._headers_dict = {}
         self.object_stack = []
         self.streaming_response = False
+        #: permissions resolved for the request's user, see DjangoUserPermissionValidator
+        self.permission_cache = {}
+        #: database alias reads are routed to, if not the default one
+        self.read_database = None
+        #: optional policy for re-running write transactions that failed on transient database errors
+        self.retry_policy = None
 
     def resolve_resource_uri(self, uri):
         """
@@ -42,17 +48,17 @@ class APIContext(object):
         but only within the same resource tree.
         """
         resource = self.root_resource
-        cur_resource_path = ''
+        path_fragments = _split_resource_path(resource_path)
 
-        for path_fragment in _split_resource_path(resource_path):
-            cur_resource_path = cur_resource_path + '/' + path_fragment
+        for depth, path_fragment in enumerate(path_fragments, 1):
             resource = resource.get_child_resource(self, path_fragment)
 
             if not resource:
                 return None
 
             if resource.resource_path is None:
-                resource.resource_path = cur_resource_path
+                # Only built for the rare resource that is not addressable on its own
+                resource.resource_path = '/' + '/'.join(path_fragments[:depth])
 
         return resource
 
@@ -7,17 +7,32 @@ class DjangoUserPermissionValidator(object):
         self.permission_name = permission_name
         self.auth_adapter = auth_adapter
 
+    def has_permission(self, ctx):
+        """
+        Whether the request's user has the permission, resolved with has_perm
+        only once per request and cached on the context.
+        """
+        cache = getattr(ctx, 'permission_cache', None)
+        if cache is None:
+            cache = ctx.permission_cache = {}
+
+        try:
+            return cache[self.permission_name]
+        except KeyError:
+            has_perm = cache[self.permission_name] = ctx.request.user.has_perm(self.permission_name)
+            return has_perm
+
     def is_write_authorized(self, ctx, target_obj, source, target):
         """
         Leverages the users has_perm(key) method to leverage the authorization.
         Only check if the source and target have changed.
         """
-        user = ctx.request.user
-
         if source != target:
-            return user.has_perm(self.permission_name)
+            return self.has_permission(ctx)
 
         return True
+    # Every write is authorized when has_permission is, see savory_pie.auth.authorization
+    is_write_authorized.granted_by_has_permission = True
 
     def fill_schema(self, schema_dict):
         # TODO: implement fill_schema
@@ -0,0 +1,259 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.db.models.signals import post_delete, post_save
+
+
+class LRUCache(object):
+    """
+    Thread safe, in-process least recently used cache.
+
+    Parameters:
+
+        ``max_entries``
+            maximum number of entries held - defaults to 1000
+
+        ``max_size``
+            optional - maximum total size, as reported by ``sizeof``, of the
+            values held
+
+        ``sizeof``
+            optional - function computing the size of a value - defaults to len
+    """
+    def __init__(self, max_entries=1000, max_size=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, size = self._entries.pop(key)
+            except KeyError:
+                return default
+            # Re-inserting moves the entry to the most recently used end
+            self._entries[key] = (value, size)
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if self.max_size is not None and size > self.max_size:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or \
+                    (self.max_size is not None and self.size > self.max_size):
+                self._discard(next(iter(self._entries)))
+
+    def get_many(self, keys):
+        """
+        Returns a dict of the values found for keys, as Django caches do.
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key, self)
+            if value is not self:
+                found[key] = value
+        return found
+
+    def set_many(self, data):
+        for key, value in data.items():
+            self.set(key, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+def model_class_of(resource):
+    """
+    Returns the Model class backing a ModelResource or QuerySetResource, or None.
+    """
+    model_class = getattr(resource, 'model_class', None)
+    if model_class is None:
+        resource_class = getattr(resource, 'resource_class', None)
+        model_class = getattr(resource_class, 'model_class', None)
+    return model_class
+
+
+def user_scope(ctx):
+    """
+    Default authorization scope for cached responses: responses are only shared
+    between requests made by the same user.
+    """
+    user = getattr(ctx.request, 'user', None)
+    if user is None or not user.is_authenticated():
+        return 'anonymous'
+    return 'user:{0}'.format(getattr(user, 'pk', None))
+
+
+class ResponseCache(object):
+    """
+    Opt-in cache of rendered GET responses, passed to
+    :func:`savory_pie.django.views.api_view`.
+
+    Responses are keyed by resource path, query parameters, formatter and an
+    authorization scope. Every entry is also tagged with the resource's
+    model_class (or, for resources without one, the top level of its path).
+    POST/PUT/DELETE handled by savory_pie, and post_save/post_delete signals
+    of a tagged model, move the tag to a new generation so existing entries
+    for it are never served again.
+
+    Parameters:
+
+        ``max_entries``
+            maximum number of responses held in process - defaults to 1000
+
+        ``max_size``
+            optional - maximum number of content bytes held in process
+
+        ``backend``
+            optional - Django cache alias (or cache object) shared between
+            processes; when set, the in-process LRU still fronts it
+
+        ``timeout``
+            optional - expiry, in seconds, of entries in the Django cache
+
+        ``scope``
+            optional - function of the ctx returning the authorization scope
+            - defaults to :func:`user_scope`
+    """
+    key_prefix = 'savory_pie:response'
+
+    def __init__(self, max_entries=1000, max_size=None, backend=None, timeout=None, scope=user_scope):
+        self.local = LRUCache(
+            max_entries=max_entries,
+            max_size=max_size,
+            sizeof=lambda entry: len(entry[1])
+        )
+        if isinstance(backend, basestring):
+            from django.core.cache import get_cache
+            backend = get_cache(backend)
+        self.backend = backend
+        self.timeout = timeout
+        self.scope = scope
+        self._generations = {}
+        self._models = set()
+
+    def get(self, key):
+        """
+        Returns the cached (status, content, headers) entry for a key, or None.
+        """
+        entry = self.local.get(key)
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+        return entry
+
+    def set(self, key, resource, entry):
+        self.watch(model_class_of(resource))
+        self.local.set(key, entry)
+        if self.backend is not None:
+            self.backend.set(key, entry, self.timeout)
+
+    def invalidate(self, resource):
+        """
+        Drops every cached response tagged like the given resource.
+        """
+        self.invalidate_tag(self._tag(resource))
+
+    def invalidate_model(self, model_class):
+        self.invalidate_tag(self._model_tag(model_class))
+
+    def invalidate_tag(self, tag):
+        if self.backend is None:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        else:
+            self.backend.set(self._generation_key(tag), uuid.uuid4().hex, None)
+
+    def get_key(self, ctx, resource, params):
+        """
+        Computes the key of a GET; compute it before the resource is read, so a
+        write racing with the read invalidates the entry stored under it.
+        """
+        tag = self._tag(resource)
+        parts = [
+            resource.resource_path or '',
+            repr(_normalized_params(params)),
+            '{0}.{1}'.format(type(ctx.formatter).__module__, type(ctx.formatter).__name__),
+            unicode(self.scope(ctx)),
+            tag,
+            str(self._generation(tag)),
+        ]
+        digest = hashlib.sha1(u'\n'.join(parts).encode('utf-8')).hexdigest()
+        return '{0}:{1}'.format(self.key_prefix, digest)
+
+    def _generation(self, tag):
+        if self.backend is None:
+            return self._generations.get(tag, 0)
+        # A random token rather than a counter: should the backend evict it, a
+        # fresh token still orphans every entry stored under the old one.
+        generation_key = self._generation_key(tag)
+        generation = self.backend.get(generation_key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            # Processes racing to create the token settle on the first one
+            if not self.backend.add(generation_key, generation, None):
+                generation = self.backend.get(generation_key) or generation
+        return generation
+
+    def _generation_key(self, tag):
+        return '{0}:generation:{1}'.format(self.key_prefix, hashlib.sha1(tag.encode('utf-8')).hexdigest())
+
+    def _tag(self, resource):
+        model_class = model_class_of(resource)
+        if model_class is not None:
+            return self._model_tag(model_class)
+        resource_path = resource.resource_path or ''
+        return u'path:' + resource_path.split('/', 1)[0]
+
+    @staticmethod
+    def _model_tag(model_class):
+        return u'model:{0}.{1}'.format(model_class.__module__, model_class.__name__)
+
+    def watch(self, model_class):
+        """
+        Invalidates responses for model_class whenever one of its instances is
+        saved or deleted. Models are watched once a response for them is cached;
+        processes sharing a backend without serving GETs should watch explicitly.
+        """
+        if model_class is None or model_class in self._models:
+            return
+        self._models.add(model_class)
+        post_save.connect(self._model_changed, sender=model_class, weak=False)
+        post_delete.connect(self._model_changed, sender=model_class, weak=False)
+
+    def _model_changed(self, sender, **kwargs):
+        self.invalidate_model(sender)
+
+
+def _normalized_params(params):
+    if hasattr(params, 'lists'):
+        items = params.lists()
+    else:
+        items = [
+            (key, value if isinstance(value, (list, tuple)) else [value])
+            for key, value in params.items()
+        ]
+    return sorted((key, sorted(values)) for key, values in items)
@@ -0,0 +1,112 @@
+from django.db.models.fields import FieldDoesNotExist
+
+from savory_pie.context import APIContext
+from savory_pie.django.resources import ModelResource, QuerySetResource, SchemaResource
+from savory_pie.django.validators import get_validation_plan
+from savory_pie.errors import SavoryPieError
+from savory_pie.formatters import JSONFormatter
+from savory_pie.resources import APIResource
+
+
+def compile_api(root_resource, formatter=None):
+    """
+    Walks the resource tree rooted at root_resource ahead of the first request:
+    resolves resource classes given by name, checks that the attributes of every
+    field exist on its model, and computes the per-class plans (allowed methods,
+    property names, prepare plans, validation plans and schemas) that would
+    otherwise be built lazily by the first requests.
+
+    Call it before a pre-forking server forks, so the workers share the plans.
+    Raises a SavoryPieError describing every broken definition found.
+
+    Returns the set of ModelResource classes reachable from root_resource.
+    """
+    compiler = _Compiler(APIContext(
+        base_uri='',
+        root_resource=root_resource,
+        formatter=formatter or JSONFormatter()
+    ))
+    compiler.visit_resource(root_resource)
+    if compiler.errors:
+        raise SavoryPieError('Invalid API definition:\n' + '\n'.join(compiler.errors))
+    return compiler.resource_classes
+
+
+class _Compiler(object):
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.errors = []
+        self.resource_classes = set()
+
+    def visit_resource(self, resource):
+        # Caches the allowed methods of the resource's class
+        resource.allowed_methods
+        if isinstance(resource, APIResource):
+            for child_resource in resource.child_resources:
+                self.visit_resource(child_resource)
+        elif isinstance(resource, QuerySetResource):
+            error_count = len(self.errors)
+            self.visit_resource_class(resource.resource_class)
+            # Plans are only computed for sound definitions, errors are reported together
+            if len(self.errors) == error_count:
+                resource.get_prepare_plan(self.ctx)
+        elif isinstance(resource, ModelResource):
+            self.visit_resource_class(type(resource))
+
+    def visit_resource_class(self, resource_class):
+        if resource_class in self.resource_classes:
+            return
+        self.resource_classes.add(resource_class)
+
+        model_class = getattr(resource_class, 'model_class', None)
+        if model_class is None:
+            self.errors.append('{0} has no model_class'.format(resource_class.__name__))
+            return
+
+        error_count = len(self.errors)
+        for field in resource_class.fields:
+            self.visit_field(resource_class, model_class, field)
+        if len(self.errors) > error_count:
+            return
+
+        get_validation_plan(self.ctx, resource_class)
+        SchemaResource.warm(resource_class, self.ctx.formatter)
+
+    def visit_field(self, resource_class, model_class, field):
+        try:
+            field._compute_property(self.ctx)
+        except AttributeError:
+            pass
+
+        attribute = getattr(field, '_full_attribute', None) or getattr(field, '_attribute', None)
+        if isinstance(attribute, basestring):
+            name = attribute.split('.')[0].split('__')[0]
+            if not _has_attribute(model_class, name):
+                self.errors.append('{0}: {1} has no attribute {2}'.format(
+                    resource_class.__name__,
+                    model_class.__name__,
+                    name
+                ))
+
+        if hasattr(type(field), '_resource_class'):
+            try:
+                sub_resource_class = field._resource_class
+            except (ImportError, AttributeError, ValueError), e:
+                self.errors.append('{0}: cannot resolve {1!r}: {2}'.format(
+                    resource_class.__name__,
+                    field._arg_resource_class,
+                    e
+                ))
+                return
+            if isinstance(sub_resource_class, type) and issubclass(sub_resource_class, ModelResource):
+                self.visit_resource_class(sub_resource_class)
+
+
+def _has_attribute(model_class, name):
+    if name == 'pk' or hasattr(model_class, name):
+        return True
+    try:
+        model_class._meta.get_field_by_name(name)
+    except FieldDoesNotExist:
+        return False
+    return True
@@ -0,0 +1,151 @@
+import datetime
+import json
+import multiprocessing
+import os
+
+from django.db import connections
+from django.utils.datastructures import MultiValueDict
+
+from savory_pie.context import APIContext
+from savory_pie.formatters import JSONFormatter
+from savory_pie.resources import _ParamsImpl
+
+# The export running in this process, inherited by forked workers so that
+# neither the resource nor its queryset need to be pickled.
+_job = None
+
+
+def export_queryset_resource(queryset_resource, directory, params=None, processes=None, shards=None,
+                             base_uri='', merge=False):
+    """
+    Exports every object of queryset_resource matching params, the same query
+    parameters a GET takes, as newline delimited JSON, in parallel.
+
+    The filtered queryset is split into shards contiguous ranges of primary
+    keys of about the same size, each written by one of processes worker
+    processes, with their own database connections, to ``part-NNNNN.ndjson``
+    in directory.  A ``manifest.json`` lists the parts in primary key order
+    with their counts.  If merge is True the parts are then concatenated,
+    with the trailer line of :meth:`QuerySetResource.export`, into
+    ``export.ndjson``, which the manifest names instead of the parts.
+
+    processes defaults to the number of CPUs and shards to processes; with a
+    single process the shards are written in this process.  An export limited
+    by limit_object_count is written as a single shard.  resourceUris are
+    built from base_uri.
+
+    Returns the manifest.
+    """
+    global _job
+
+    processes = processes or multiprocessing.cpu_count()
+    shards = shards or processes
+    ctx = APIContext(base_uri=base_uri, root_resource=None, formatter=JSONFormatter())
+    queryset = queryset_resource.filter_queryset(
+        ctx,
+        _ParamsImpl(_to_multi_value_dict(params or {})),
+        queryset_resource.queryset.all().distinct()
+    )
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    ranges = _pk_ranges(queryset, shards)
+    _job = (queryset_resource, queryset, ctx, directory)
+    try:
+        if processes == 1 or len(ranges) == 1:
+            parts = map(_export_shard, ranges)
+        else:
+            # Forked workers must not share the connections of this process
+            _close_connections()
+            pool = multiprocessing.Pool(processes, initializer=_close_connections)
+            try:
+                parts = pool.map(_export_shard, ranges)
+            finally:
+                pool.close()
+                pool.join()
+    finally:
+        _job = None
+
+    manifest = {
+        'created': datetime.datetime.utcnow().isoformat('T'),
+        'count': sum(part['count'] for part in parts),
+        'parts': parts,
+    }
+    if queryset_resource.resource_path is not None:
+        manifest['resourceUri'] = ctx.build_resource_uri(queryset_resource)
+
+    if merge:
+        manifest['file'] = _merge(directory, manifest)
+        del manifest['parts']
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+
+def _to_multi_value_dict(params):
+    multi_value_dict = MultiValueDict()
+    for key, value in params.items():
+        multi_value_dict.setlist(key, value if isinstance(value, (list, tuple)) else [value])
+    return multi_value_dict
+
+
+def _pk_ranges(queryset, shards):
+    """
+    Splits queryset into at most shards (index, lower, upper) ranges of primary
+    keys, lower exclusive and upper inclusive, None meaning unbounded.
+    """
+    if not queryset.query.can_filter():
+        # A filter applied limit_object_count, the slice cannot be split by key
+        return [(0, None, None)]
+
+    count = queryset.count()
+    size = -(-count // shards) or 1
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    uppers = [pks[offset - 1] for offset in range(size, count, size)]
+
+    lowers = [None] + uppers
+    return [
+        (index, lower, upper)
+        for index, (lower, upper) in enumerate(zip(lowers, uppers + [None]))
+    ]
+
+
+def _export_shard(pk_range):
+    index, lower, upper = pk_range
+    queryset_resource, queryset, ctx, directory = _job
+    if lower is not None:
+        queryset = queryset.filter(pk__gt=lower)
+    if upper is not None:
+        queryset = queryset.filter(pk__lte=upper)
+
+    name = 'part-{0:05d}.ndjson'.format(index)
+    count = 0
+    with open(os.path.join(directory, name), 'w') as part_file:
+        for model in queryset_resource._iter_chunks(ctx, queryset):
+            part_file.write(json.dumps(queryset_resource._get_object(ctx, model)) + '\n')
+            count += 1
+    return {'file': name, 'count': count}
+
+
+def _merge(directory, manifest):
+    name = 'export.ndjson'
+    with open(os.path.join(directory, name), 'w') as export_file:
+        for part in manifest['parts']:
+            path = os.path.join(directory, part['file'])
+            with open(path) as part_file:
+                for line in part_file:
+                    export_file.write(line)
+            os.remove(path)
+
+        meta = {'count': manifest['count']}
+        if 'resourceUri' in manifest:
+            meta['resourceUri'] = manifest['resourceUri']
+        export_file.write(json.dumps({'meta': meta}) + '\n')
+    return name
+
+
+def _close_connections():
+    for connection in connections.all():
+        connection.close()
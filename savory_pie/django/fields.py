@@ -29,16 +29,15 @@ class DjangoField(base_fields.Field):
     def schema(self, ctx, **kwargs):
         model = kwargs['model']
         field_name = (model._meta.pk.name if self.name == 'pk' else self.name)
-        # TODO: need to remove _field, field is a global state, we should not be changing it on an instance level
-        self._field = None
+        # Fields are shared by every request, keep the model field local
         try:
-            self._field = model._meta.get_field(field_name)
+            model_field = model._meta.get_field(field_name)
         except:
             # probably only for m2m fields
             try:
-                self._field = model._meta.get_field_by_name(field_name)[0].field
+                model_field = model._meta.get_field_by_name(field_name)[0].field
             except FieldDoesNotExist:
-                self._field = None
+                model_field = None
 
         schema = super(DjangoField, self).schema(ctx, **kwargs)
         if isinstance(self.validator, collections.Iterable):
@@ -46,17 +45,17 @@ class DjangoField(base_fields.Field):
         else:
             schema['validators'] = [self.validator.to_schema()]
 
-        if self._field:
+        if model_field:
             _schema = {
-                'blank': self._field.blank,
-                'default': ctx.formatter.to_api_value(type(self._field.get_default()), self._field.get_default()),
-                'helpText': self._field.help_text,
-                'nullable': self._field.null,
-                'readonly': not self._field.editable,
-                'unique': self._field.unique
+                'blank': model_field.blank,
+                'default': ctx.formatter.to_api_value(type(model_field.get_default()), model_field.get_default()),
+                'helpText': model_field.help_text,
+                'nullable': model_field.null,
+                'readonly': not model_field.editable,
+                'unique': model_field.unique
             }
-            if self._field.choices:
-                _schema['choices'] = self._field.choices
+            if model_field.choices:
+                _schema['choices'] = model_field.choices
             if isinstance(_schema['helpText'], Promise):
                 _schema['helpText'] = unicode(_schema['helpText'])
         else:
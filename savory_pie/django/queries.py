@@ -0,0 +1,225 @@
+import contextlib
+import logging
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connections
+
+from savory_pie.errors import SavoryPieError
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Quoted strings and numbers, then the lists of them left by IN clauses
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def active_recorder():
+    """
+    Returns the recorder of the request being monitored on this thread, or None.
+    """
+    return getattr(_local, 'recorder', None)
+
+
+def normalize_sql(sql):
+    """
+    Returns sql with its literal values replaced by ?, and lists of them by
+    (...), so statements differing only by their values compare equal.
+    """
+    return _LISTS.sub('(...)', _LITERALS.sub('?', sql))
+
+
+class QueryMonitor(object):
+    """
+    Per-request accounting of SQL queries, passed to
+    :func:`savory_pie.django.views.api_view` or
+    :func:`savory_pie.django.views.batch_api_view`.
+
+    Every query the request runs on the monitored databases is recorded, with
+    the Field whose handle_outgoing or handle_incoming issued it.  At the end
+    of the request the count and total time are logged, and statements run
+    repeat_threshold times or more, up to their literal values, are logged as
+    warnings naming the fields that issued them: they likely are N+1 patterns
+    calling for a prepare, select or prefetch.
+
+    Parameters:
+
+        ``repeat_threshold``
+            number of runs of the same statement from which it is reported
+            - defaults to 5
+
+        ``headers``
+            whether responses carry X-Query-Count and X-Query-Time headers
+            - defaults to settings.DEBUG
+
+        ``databases``
+            aliases of the monitored databases - defaults to all of them
+
+    Queries are recorded on the thread handling the request, so batch
+    sub-requests are not run concurrently when monitored.  Queries run while
+    a response is streamed are logged once it is complete, but are not part
+    of its headers.
+    """
+    def __init__(self, repeat_threshold=5, headers=None, databases=None):
+        self.repeat_threshold = repeat_threshold
+        self.headers = headers
+        self.databases = databases
+
+    def start(self):
+        recorder = _Recorder(self.databases or [connection.alias for connection in connections.all()])
+        recorder.previous = active_recorder()
+        _local.recorder = recorder
+        return recorder
+
+    def stop(self, recorder):
+        _local.recorder = recorder.previous
+        return recorder.stop()
+
+    def finish(self, recorder, request, response):
+        """
+        Stops recording, reports the queries of request and adds the headers to
+        response, unless it is streaming, in which case both wait for it to be
+        consumed.
+        """
+        if response.streaming:
+            _local.recorder = recorder.previous
+            response.streaming_content = self._iter_recorded(recorder, request, response.streaming_content)
+            return response
+
+        report = self.stop(recorder)
+        if self._with_headers():
+            response['X-Query-Count'] = str(report.count)
+            response['X-Query-Time'] = '{0:.3f}'.format(report.time)
+        self.report(request, report)
+        return response
+
+    def _iter_recorded(self, recorder, request, content):
+        recorder.previous = active_recorder()
+        _local.recorder = recorder
+        try:
+            for chunk in content:
+                yield chunk
+        finally:
+            self.report(request, self.stop(recorder))
+
+    def _with_headers(self):
+        return self.headers if self.headers is not None else _debug()
+
+    def report(self, request, report):
+        """
+        Logs the report of request; override to send it elsewhere.
+        """
+        path = request.get_full_path()
+        logger.debug('%s %s: %d queries in %.3fs', request.method, path, report.count, report.time)
+        for statement, count, fields in report.repeats(self.repeat_threshold):
+            logger.warning(
+                'Likely N+1 queries in %s %s: %d runs of %s issued by %s',
+                request.method,
+                path,
+                count,
+                statement,
+                ', '.join(fields) or 'no field'
+            )
+
+
+class QueryReport(object):
+    """
+    The queries of a request, as dicts of database, sql, time and field, the
+    label of the field that issued the query if any.
+    """
+    def __init__(self, queries):
+        self.queries = queries
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def time(self):
+        return sum(query['time'] for query in self.queries)
+
+    def repeats(self, threshold):
+        """
+        Returns (statement, count, fields) for every normalized statement run
+        at least threshold times, most run first.
+        """
+        counts = defaultdict(int)
+        fields = defaultdict(set)
+        for query in self.queries:
+            statement = normalize_sql(query['sql'])
+            counts[statement] += 1
+            if query['field'] is not None:
+                fields[statement].add(query['field'])
+
+        return sorted(
+            [
+                (repeated, count, sorted(fields[repeated]))
+                for repeated, count in counts.items()
+                if count >= threshold
+            ],
+            key=lambda repeat: -repeat[1]
+        )
+
+
+class _Recorder(object):
+    def __init__(self, aliases):
+        self.previous = None
+        self.connections = [connections[alias] for alias in aliases]
+        self.use_debug_cursors = [connection.use_debug_cursor for connection in self.connections]
+        self.starts = [len(connection.queries) for connection in self.connections]
+        # (connection index, query index) -> label of the field that issued the query
+        self.fields = {}
+        for connection in self.connections:
+            connection.use_debug_cursor = True
+
+    @contextlib.contextmanager
+    def field(self, resource, field):
+        """
+        Attributes the queries run within the block to field of resource,
+        unless a field nested within it already claimed them.
+        """
+        marks = [len(connection.queries) for connection in self.connections]
+        try:
+            yield
+        finally:
+            label = None
+            for index, (connection, mark) in enumerate(zip(self.connections, marks)):
+                for query_index in xrange(mark, len(connection.queries)):
+                    if (index, query_index) not in self.fields:
+                        label = label or _label(resource, field)
+                        self.fields[(index, query_index)] = label
+
+    def stop(self):
+        queries = []
+        for index, connection in enumerate(self.connections):
+            start = self.starts[index]
+            for query_index, query in enumerate(connection.queries[start:], start):
+                queries.append({
+                    'database': connection.alias,
+                    'sql': query['sql'],
+                    'time': float(query['time']),
+                    'field': self.fields.get((index, query_index)),
+                })
+
+            use_debug_cursor = connection.use_debug_cursor = self.use_debug_cursors[index]
+            # Only keep the queries Django would have kept on its own
+            if not (use_debug_cursor or (use_debug_cursor is None and _debug())):
+                del connection.queries[start:]
+        return QueryReport(queries)
+
+
+def _debug():
+    # Hide this import from sphinx
+    from django.conf import settings
+    return settings.DEBUG
+
+
+def _label(resource, field):
+    try:
+        name = field.name
+    except SavoryPieError:
+        name = '?'
+    return '{0}.{1} ({2})'.format(type(resource).__name__, name, type(field).__name__)
@@ -1,20 +1,50 @@
 from collections import OrderedDict
+import contextlib
+import copy
+import datetime
+import hashlib
+import json
 import logging
 import urllib
+import uuid
 
 import dirty_bits
 import django.core.exceptions
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 from savory_pie.django.fields import ReverseField
+from savory_pie.django.queries import active_recorder
 from savory_pie.django.utils import Related
 from savory_pie.django.validators import ValidationError, validate
+from savory_pie.context import APIContext
 from savory_pie.errors import SavoryPieError
+from savory_pie.fields import AttributeField, IterableField, SubObjectResourceField
+from savory_pie.formatters import JSONFormatter
 from savory_pie.helpers import get_sha1
-from savory_pie.resources import EmptyParams, Resource
+from savory_pie.resources import EmptyParams, Resource, _ParamsImpl
 
 logger = logging.getLogger(__name__)
 
 
+def _is_own_attribute(field):
+    """
+    Whether field only renders an attribute of the model itself.
+    """
+    if not isinstance(field, AttributeField):
+        return False
+    return '.' not in field._full_attribute and '__' not in field._full_attribute
+
+
+def _hash_parts(*parts):
+    return hashlib.sha1(u'\n'.join(unicode(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+# Related-s collected by QuerySetResource.prepare, see QuerySetResource.get_prepare_plan
+_prepare_plans = {}
+
+
 class QuerySetResource(Resource):
     """
     Resource abstract around Django QuerySets.
@@ -44,6 +74,30 @@ class QuerySetResource(Resource):
     #TODO: We need to swap this to False eventually and whitelist. However to limit halo, a blacklist will be used.
     allow_unfiltered_query = True
 
+    #: optional - if True, a DELETE against this resource deletes every object
+    #: matching the request's filters in a single set-based statement
+    #: - defaults to False
+    allow_bulk_delete = False
+
+    #: optional - attributes of the resource_class's AttributeFields that may be
+    #: set on every object matching the request's filters with a single PUT
+    #: - defaults to [] (no bulk updates)
+    bulk_update_fields = []
+
+    #: optional - attribute of the resource_class's model_class holding the time
+    #: of its last modification; if set, conditional GETs are answered from the
+    #: max of it and the count of the filtered queryset, without rendering
+    #: - defaults to None
+    last_modified_attribute = None
+
+    #: optional - if True, a GET with export=ndjson streams every object matching
+    #: the request's filters as newline delimited JSON, see export
+    #: - defaults to False
+    allow_export = False
+
+    #: number of objects read per query during an export
+    export_chunk_size = 1000
+
     def __init__(self, queryset=None):
         if queryset is not None:
             self.queryset = queryset
@@ -54,6 +108,25 @@ class QuerySetResource(Resource):
     def supports_paging(self):
         return self.page_size is not None
 
+    @property
+    def allowed_methods(self):
+        allowed_methods = super(QuerySetResource, self).allowed_methods
+        # Subclasses implementing put or delete themselves are left alone
+        if not self.allow_bulk_delete and self._inherits('delete'):
+            allowed_methods.discard('DELETE')
+        if not self.bulk_update_fields and self._inherits('put'):
+            allowed_methods.discard('PUT')
+        return allowed_methods
+
+    @property
+    def supports_if_match(self):
+        # Bulk updates have no prior representation an If-Match hash could be
+        # checked against, so bulk PUTs with an If-Match fail their precondition
+        return not self._inherits('put')
+
+    def _inherits(self, method):
+        return getattr(type(self), method).im_func is getattr(QuerySetResource, method).im_func
+
     @property
     def resource_path(self):
         return self.resource_class.parent_resource_path
@@ -96,9 +169,32 @@ class QuerySetResource(Resource):
         cls.resource_class.prepare(ctx, related)
 
     def prepare_queryset(self, ctx, queryset):
-        related = Related()
-        self.prepare(ctx, related)
-        return related.prepare(queryset)
+        return self.get_prepare_plan(ctx).prepare(queryset)
+
+    def get_prepare_plan(self, ctx):
+        """
+        Returns the Related collected by prepare.  It is computed once per
+        QuerySetResource class, resource_class and formatter class, so prepare
+        must not depend on anything else in the ctx.
+        """
+        key = (type(self), self.resource_class, type(ctx.formatter))
+        try:
+            return _prepare_plans[key]
+        except KeyError:
+            related = Related()
+            self.prepare(ctx, related)
+            _prepare_plans[key] = related
+            return related
+
+    def read_queryset(self, ctx):
+        """
+        Returns the queryset, reading from the ctx's read_database if it has one.
+        Models loaded from it are saved back to it, so it is only set for GETs.
+        """
+        read_database = getattr(ctx, 'read_database', None)
+        if read_database is None:
+            return self.queryset
+        return self.queryset.using(read_database)
 
     def has_valid_key(self, ctx, params):
         get_query_dict = getattr(params, '_GET', None)
@@ -113,25 +209,61 @@ class QuerySetResource(Resource):
                     return True
         return False
 
+    def get_cache_validators(self, ctx, params):
+        """
+        Provides an ETag and Last-Modified aggregated over the filtered queryset,
+        when last_modified_attribute is set and, as for ModelResource, the
+        objects cannot change without it.  The aggregate is a query of its
+        own, so it is only made for conditional requests.
+        """
+        if self.last_modified_attribute is None:
+            return None
+        resource_class = self.resource_class
+        if resource_class.fragment_cache is None and not all(_is_own_attribute(field) for field in resource_class.fields):
+            return None
+        meta = getattr(getattr(ctx, 'request', None), 'META', {})
+        if 'HTTP_IF_NONE_MATCH' not in meta and 'HTTP_IF_MODIFIED_SINCE' not in meta:
+            return None
+        if not self.allow_unfiltered_query and not self.has_valid_key(ctx, params):
+            return None
+
+        queryset = self.filter_queryset(ctx, params, self.read_queryset(ctx).all().distinct())
+        aggregates = queryset.aggregate(
+            last_modified=Max(self.last_modified_attribute),
+            count=Count('pk')
+        )
+        etag = _hash_parts(
+            type(self).__module__,
+            type(self).__name__,
+            ctx.base_uri,
+            type(ctx.formatter).__name__,
+            sorted((key, sorted(params.get_list(key))) for key in params.keys()),
+            aggregates['last_modified'],
+            aggregates['count'],
+            resource_class._get_fragment_generation() if resource_class.fragment_cache is not None else None,
+        )
+        return etag, aggregates['last_modified']
+
     def get(self, ctx, params):
         if not self.allow_unfiltered_query and not self.has_valid_key(ctx, params):
             raise SavoryPieError(
                 'Request must be filtered, will not return all.  Acceptable filters are: {0}'.format([filter.name for filter in self.filters])
             )
 
-        complete_queryset = self.queryset.all().distinct()
+        complete_queryset = self.read_queryset(ctx).all().distinct()
 
         filtered_queryset = self.filter_queryset(ctx, params, complete_queryset)
-        sliced_queryset = self.slice_queryset(ctx, params, filtered_queryset)
+        if self.allow_export and params.get('export') == 'ndjson':
+            return self.export(ctx, filtered_queryset)
 
-        # prepare must be last for optimization to be respected by Django.
-        final_queryset = self.prepare_queryset(ctx, sliced_queryset)
+        sliced_queryset = self.slice_queryset(ctx, params, filtered_queryset)
 
-        objects = []
-        for model in final_queryset:
-            model_json = self.to_resource(model).get(ctx, EmptyParams())
-            model_json['$hash'] = get_sha1(ctx, model_json)
-            objects.append(model_json)
+        if self.resource_class.fragment_cache is not None:
+            objects = self._get_cached_objects(ctx, filtered_queryset, sliced_queryset)
+        else:
+            # prepare must be last for optimization to be respected by Django.
+            final_queryset = self.prepare_queryset(ctx, sliced_queryset)
+            objects = [self._get_object(ctx, model) for model in final_queryset]
 
         meta = dict()
         if self.supports_paging:
@@ -163,6 +295,90 @@ class QuerySetResource(Resource):
             'objects': objects
         }
 
+    def export(self, ctx, queryset):
+        """
+        Streams every object of the filtered queryset as a line of JSON, then a
+        trailer line holding the meta; a response without the trailer was cut
+        short.  Objects are read export_chunk_size at a time, ordered by and
+        resumed from the primary key, so neither memory use nor the cost of a
+        chunk grows with the size of the collection, and no COUNT is made.
+        """
+        ctx.streaming_response = True
+        ctx.set_header('Content-Type', 'application/x-ndjson')
+
+        def lines():
+            count = 0
+            for model in self._iter_chunks(ctx, queryset):
+                yield json.dumps(self._get_object(ctx, model)) + '\n'
+                count += 1
+
+            meta = {'count': count}
+            if self.resource_path is not None:
+                meta['resourceUri'] = ctx.build_resource_uri(self)
+            yield json.dumps({'meta': meta}) + '\n'
+        return lines()
+
+    def _iter_chunks(self, ctx, queryset):
+        if not queryset.query.can_filter():
+            # A filter applied limit_object_count, the slice cannot be resumed by key
+            for model in self.prepare_queryset(ctx, queryset):
+                yield model
+            return
+
+        queryset = queryset.order_by('pk')
+        chunk_queryset = queryset
+        while True:
+            # prepare must be last for optimization to be respected by Django.
+            models = list(self.prepare_queryset(ctx, chunk_queryset[:self.export_chunk_size]))
+            for model in models:
+                yield model
+            if len(models) < self.export_chunk_size:
+                return
+            chunk_queryset = queryset.filter(pk__gt=models[-1].pk)
+
+    def _get_object(self, ctx, model):
+        model_json = self.to_resource(model).get(ctx, EmptyParams())
+        model_json['$hash'] = get_sha1(ctx, model_json)
+        return model_json
+
+    def _get_cached_objects(self, ctx, filtered_queryset, sliced_queryset):
+        """
+        Reads only the keys (and versions) of the page, takes the representations
+        it can from the resource_class's fragment_cache and renders the rest.
+        """
+        resource_class = self.resource_class
+        attr, type_ = resource_class.published_key
+        if resource_class.version_attribute:
+            rows = list(sliced_queryset.values_list(attr, resource_class.version_attribute))
+        else:
+            rows = [(row[0], None) for row in sliced_queryset.values_list(attr)]
+
+        cache = resource_class.fragment_cache
+        generation = resource_class._get_fragment_generation()
+        cache_keys = [resource_class.get_fragment_key(ctx, key, version, generation) for key, version in rows]
+        fragments = cache.get_many(cache_keys)
+
+        missing = dict(
+            (str(key), cache_key)
+            for (key, version), cache_key in zip(rows, cache_keys)
+            if cache_key not in fragments
+        )
+        if missing:
+            queryset = filtered_queryset.filter(**{attr + '__in': [type_(key) for key in missing]})
+            rendered = {}
+            # prepare must be last for optimization to be respected by Django.
+            for model in self.prepare_queryset(ctx, queryset):
+                missing_key = missing.get(str(getattr(model, attr)))
+                if missing_key is not None:
+                    rendered[missing_key] = self._get_object(ctx, model)
+            # A lagging replica could store stale fragments under a generation
+            # bumped by a newer write; versioned keys are safe to fill from it.
+            if resource_class.version_attribute or getattr(ctx, 'read_database', None) is None:
+                cache.set_many(rendered)
+            fragments.update(rendered)
+
+        return [fragments[cache_key] for cache_key in cache_keys if cache_key in fragments]
+
     def post(self, ctx, source_dict):
         resource = self.resource_class.create_resource()
         if filter(lambda field: isinstance(field, ReverseField), resource.fields):
@@ -179,12 +395,75 @@ class QuerySetResource(Resource):
 
         return resource
 
+    def _bulk_queryset(self, ctx):
+        """
+        Builds the queryset targeted by a bulk PUT or DELETE from the filters
+        in the request's query string.  At least one filter must apply, so a
+        bare request can never touch the whole collection.
+        """
+        params = _ParamsImpl(ctx.request.GET)
+        if not any(filter.is_applicable(ctx, params) for filter in self.filters):
+            raise ValidationError(self, {'unfilteredBulkRequest': [filter.name for filter in self.filters]})
+
+        queryset = self.filter_queryset(ctx, params, self.queryset.all())
+        if not queryset.query.can_filter():
+            # A filter applied limit_object_count, Django cannot UPDATE or DELETE a slice.
+            raise ValidationError(self, {'slicedBulkRequest': 'bulk requests cannot be combined with limit_object_count'})
+
+        # Orderings are meaningless for set-based statements
+        return queryset.order_by()
+
+    def _bulk_result(self, ctx, count):
+        return {'meta': {ctx.formatter.convert_to_public_property('affected_count'): count}}
+
+    def put(self, ctx, source_dict):
+        """
+        Sets the bulk_update_fields present in source_dict on every object matching
+        the request's filters with a single UPDATE statement.  Model save methods
+        and signals are not run.
+        """
+        fields = dict(
+            (field._compute_property(ctx), field)
+            for field in self.resource_class.fields
+            if getattr(field, '_full_attribute', None) in self.bulk_update_fields
+        )
+
+        unknown_properties = [name for name in source_dict if name not in fields]
+        if unknown_properties:
+            raise ValidationError(self, {'invalidBulkFields': sorted(unknown_properties)})
+
+        updates = {}
+        for name, value in source_dict.items():
+            field = fields[name]
+            try:
+                updates[field._full_attribute] = field.to_python_value(ctx, value)
+            except TypeError, e:
+                raise ValidationError(self, {'invalidFieldData': e.message})
+
+        if not updates:
+            raise ValidationError(self, {'missingData': 'no bulk update fields were provided'})
+
+        count = self._bulk_queryset(ctx).update(**updates)
+        return self._bulk_result(ctx, count)
+
+    def delete(self, ctx):
+        """
+        Deletes every object matching the request's filters.
+        """
+        queryset = self._bulk_queryset(ctx)
+        # QuerySet.delete does not report the number of deleted rows, count them
+        # within the same transaction
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            count = queryset.count()
+            queryset.delete()
+        return self._bulk_result(ctx, count)
+
     def get_child_resource(self, ctx, path_fragment):
         if path_fragment == 'schema':
             return SchemaResource(self.resource_class)
 
         # No need to filter or slice here, does not make sense as part of get_child_resource
-        queryset = self.prepare_queryset(ctx, self.queryset)
+        queryset = self.prepare_queryset(ctx, self.read_queryset(ctx))
         try:
             model = self.resource_class.get_from_queryset(queryset, path_fragment)
             return self.to_resource(model)
@@ -239,8 +518,104 @@ class ModelResource(Resource):
     #: integrity on a model.
     validators = []
 
+    #: optional - cache holding the representation of each object, used by
+    #: QuerySetResource.get to render only the objects missing from it; a
+    #: :class:`savory_pie.django.cache.LRUCache` or a Django cache
+    #: - defaults to None (no caching)
+    fragment_cache = None
+
+    #: optional - attribute of model_class that changes on every save, such as
+    #: a version counter or modification time.  When set, a save only replaces
+    #: the fragment of the saved object; otherwise it invalidates every fragment.
+    #: It also provides the ETag of conditional GETs, unless fields embed other
+    #: models and there is no fragment_cache tracking them.
+    version_attribute = None
+
     _resource_path = None
 
+    @classmethod
+    def get_fragment_key(cls, ctx, key, version, generation=None):
+        """
+        Key, within fragment_cache, of the representation of the object with
+        the given published key and version.  Pass the generation read once
+        for a whole page, so its keys all come from the same one.
+        """
+        return 'savory_pie:fragment:' + _hash_parts(
+            cls.__module__,
+            cls.__name__,
+            generation if generation is not None else cls._get_fragment_generation(),
+            ctx.base_uri,
+            type(ctx.formatter).__name__,
+            key,
+            version,
+        )
+
+    @classmethod
+    def invalidate_fragments(cls):
+        """
+        Discards every cached fragment of this ModelResource.  Called whenever a
+        model embedded by the fields is saved or deleted.
+        """
+        cls.fragment_cache.delete(cls._get_fragment_generation_key())
+
+    @classmethod
+    def _get_fragment_generation_key(cls):
+        return 'savory_pie:fragment:generation:{0}.{1}'.format(cls.__module__, cls.__name__)
+
+    @classmethod
+    def _get_fragment_generation(cls):
+        # A shared cache may hold the token of another process, this one must
+        # still watch its own saves.
+        cls._watch_fragment_dependencies()
+        # A random token rather than a counter: should the cache evict it, a
+        # fresh token still orphans every fragment stored under the old one.
+        generation_key = cls._get_fragment_generation_key()
+        generation = cls.fragment_cache.get(generation_key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            cls.fragment_cache.set(generation_key, generation)
+        return generation
+
+    @classmethod
+    def _get_embedded_model_classes(cls, seen=None):
+        """
+        Model classes whose data appears in the representation: the model_class,
+        and those of every resource embedded through sub-resource and iterable fields.
+        """
+        seen = set() if seen is None else seen
+        if cls in seen:
+            return set()
+        seen.add(cls)
+
+        model_classes = {cls.model_class}
+        for field in cls.fields:
+            if isinstance(field, (SubObjectResourceField, IterableField)):
+                resource_class = field._resource_class
+                if getattr(resource_class, 'model_class', None) is not None:
+                    model_classes |= resource_class._get_embedded_model_classes(seen)
+        return model_classes
+
+    @classmethod
+    def _watch_fragment_dependencies(cls):
+        if cls.__dict__.get('_fragment_receiver') is not None:
+            return
+
+        model_classes = tuple(cls._get_embedded_model_classes())
+
+        def receiver(sender, instance=None, **kwargs):
+            if isinstance(instance, model_classes):
+                cls.invalidate_fragments()
+
+        cls._fragment_receiver = receiver
+        for model_class in model_classes:
+            if model_class is cls.model_class and cls.version_attribute:
+                # Saves of the model itself are covered by the version in the key
+                continue
+            post_save.connect(receiver, sender=model_class, weak=False)
+            post_delete.connect(receiver, sender=model_class, weak=False)
+        # Relations added through a ManyToManyField save neither side
+        m2m_changed.connect(receiver, weak=False)
+
     @classmethod
     def get_from_queryset(cls, queryset, path_fragment):
         """
@@ -319,11 +694,40 @@ class ModelResource(Resource):
         # TODO: Sanity checks that path is bound properly
         self._resource_path = resource_path
 
+    def get_cache_validators(self, ctx, params):
+        """
+        Provides an ETag computed from the version_attribute, when it is set and
+        the representation cannot change without it: either every field is an
+        AttributeField of the model itself, or the fragment_cache is set, whose
+        generation changes with the models embedded.
+        """
+        if self.version_attribute is None:
+            return None
+        if self.fragment_cache is None and not all(_is_own_attribute(field) for field in self.fields):
+            return None
+
+        version = getattr(self.model, self.version_attribute)
+        etag = _hash_parts(
+            type(self).__module__,
+            type(self).__name__,
+            self._get_fragment_generation() if self.fragment_cache is not None else None,
+            ctx.base_uri,
+            type(ctx.formatter).__name__,
+            self.key,
+            version,
+        )
+        return etag, version if isinstance(version, datetime.datetime) else None
+
     def get(self, ctx, params):
         target_dict = OrderedDict()
 
+        recorder = active_recorder()
         for field in self.fields:
-            field.handle_outgoing(ctx, self.model, target_dict)
+            if recorder is None:
+                field.handle_outgoing(ctx, self.model, target_dict)
+            else:
+                with recorder.field(self, field):
+                    field.handle_outgoing(ctx, self.model, target_dict)
 
         if self.resource_path is not None:
             target_dict['resourceUri'] = ctx.build_resource_uri(self)
@@ -335,10 +739,10 @@ class ModelResource(Resource):
             try:
                 pre_save = field.pre_save
             except AttributeError:
-                field.handle_incoming(ctx, source_dict, self.model)
+                self._handle_incoming(ctx, source_dict, field)
             else:
                 if pre_save(self.model):
-                    field.handle_incoming(ctx, source_dict, self.model)
+                    self._handle_incoming(ctx, source_dict, field)
 
     def _set_post_save_fields(self, ctx, source_dict):
         for field in self.fields:
@@ -348,7 +752,15 @@ class ModelResource(Resource):
                 pass
             else:
                 if not pre_save(self.model):
-                    field.handle_incoming(ctx, source_dict, self.model)
+                    self._handle_incoming(ctx, source_dict, field)
+
+    def _handle_incoming(self, ctx, source_dict, field):
+        recorder = active_recorder()
+        if recorder is None:
+            field.handle_incoming(ctx, source_dict, self.model)
+        else:
+            with recorder.field(self, field):
+                field.handle_incoming(ctx, source_dict, self.model)
 
     def _save(self):
         if self.model.is_dirty():
@@ -362,6 +774,35 @@ class ModelResource(Resource):
             else:
                 save(self.model)
 
+    @contextlib.contextmanager
+    def _constraint_validation(self, ctx):
+        """
+        When some of the validators leave their check to a database constraint,
+        saves inside a savepoint and translates an IntegrityError raised by one
+        of those constraints into a ValidationError, as validate would have.
+        """
+        validators = [validator for validator in self.validators if getattr(validator, 'constraint', None)]
+        if not validators:
+            yield
+            return
+
+        using = router.db_for_write(self.model.__class__, instance=self.model)
+        sid = transaction.savepoint(using=using)
+        try:
+            yield
+        except IntegrityError, e:
+            transaction.savepoint_rollback(sid, using=using)
+            key = ctx.formatter.convert_to_public_property(self.__class__.__name__)
+            errors = {}
+            for validator in validators:
+                validator.find_integrity_errors(errors, ctx, key, self, e)
+            if errors:
+                logger.debug(errors)
+                raise ValidationError(self, errors)
+            raise
+        else:
+            transaction.savepoint_commit(sid, using=using)
+
     def put(self, ctx, source_dict, save=True, skip_validation=False):
         '''
         This is where we respect the 'pre_save' flag on each field.
@@ -387,7 +828,8 @@ class ModelResource(Resource):
             raise ValidationError(self, {'invalidFieldData': e.message})
 
         if save:
-            self._save()
+            with self._constraint_validation(ctx):
+                self._save()
             logger.debug('save succeeded for %s' % self)
 
         self._set_post_save_fields(ctx, source_dict)
@@ -401,24 +843,55 @@ class ModelResource(Resource):
         return [validator.to_schema() for validator in cls.validators]
 
 
+# Schema documents, and their hashes, keyed by (resource class, formatter class)
+_schemas = {}
+_schema_hashes = {}
+
+
 class SchemaResource(Resource):
+    """
+    Describes the fields, validators and methods of a ModelResource.  The
+    schema is computed once per resource class and formatter, except for the
+    allowed methods, which may differ between requests.
+    """
     def __init__(self, model_resource):
         self.__resource = model_resource
 
+    @classmethod
+    def warm(cls, model_resource, formatter=None):
+        """
+        Computes the schema of model_resource ahead of the first request for it.
+        """
+        ctx = APIContext(base_uri='', root_resource=None, formatter=formatter or JSONFormatter())
+        cls(model_resource)._get_schema(ctx)
+
     @property
     def allowed_methods(self):
         return self.__resource(self.__resource.model_class).allowed_methods
 
-    def get(self, ctx, params=None, **kwargs):
+    def _get_schema(self, ctx):
+        key = (self.__resource, type(ctx.formatter))
+        try:
+            return _schemas[key]
+        except KeyError:
+            _schemas[key] = self._build_schema(ctx)
+            return _schemas[key]
+
+    def _get_schema_hash(self, ctx):
+        key = (self.__resource, type(ctx.formatter))
+        try:
+            return _schema_hashes[key]
+        except KeyError:
+            _schema_hashes[key] = get_sha1(ctx, self._get_schema(ctx))
+            return _schema_hashes[key]
+
+    def _build_schema(self, ctx):
         schema = {
-            'allowedDetailHttpMethods': [m.lower() for m in self.allowed_methods],
-            'allowedListHttpMethods': [m.lower() for m in self.allowed_methods],
             'defaultFormat': getattr(self.__resource, 'default_format', 'application/json'),
             'defaultLimit': getattr(self.__resource, 'default_limit', 0),
             'filtering': getattr(self.__resource, 'filtering', {}),
             'ordering': getattr(self.__resource, 'ordering', []),
             'validators': self.__resource._validator_schema(),
-            'resourceUri': ctx.build_resource_uri(self),
             'fields': {},
         }
         for resource_field in self.__resource.fields:
@@ -428,3 +901,19 @@ class SchemaResource(Resource):
             except AttributeError:
                 pass
         return schema
+
+    def get_cache_validators(self, ctx, params):
+        return _hash_parts(
+            self._get_schema_hash(ctx),
+            sorted(self.allowed_methods),
+            ctx.build_resource_uri(self)
+        ), None
+
+    def get(self, ctx, params=None, **kwargs):
+        # Callers are free to modify what they are handed
+        schema = copy.deepcopy(self._get_schema(ctx))
+        allowed_methods = [m.lower() for m in self.allowed_methods]
+        schema['allowedDetailHttpMethods'] = allowed_methods
+        schema['allowedListHttpMethods'] = list(allowed_methods)
+        schema['resourceUri'] = ctx.build_resource_uri(self)
+        return schema
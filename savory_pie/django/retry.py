@@ -0,0 +1,87 @@
+import logging
+import random
+import threading
+import time
+
+from django.db import DatabaseError
+
+from savory_pie.newrelic import record_metric
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATEs of serialization failures and deadlocks
+_RETRYABLE_SQLSTATES = ('40001', '40P01')
+
+# MySQL lock wait timeout and deadlock
+_RETRYABLE_MYSQL_ERRORS = (1205, 1213)
+
+
+class RetryPolicy(object):
+    """
+    Policy passed to :func:`savory_pie.django.views.api_view` to re-run a write
+    transaction that failed on a transient database error: a serialization
+    failure, a deadlock or a lock timeout.
+
+    Parameters:
+
+        ``max_attempts``
+            maximum number of times a write is run - defaults to 3
+
+        ``backoff``
+            delay, in seconds, before the first retry; it doubles with every
+            retry and the actual delay is drawn uniformly between 0 and it
+            - defaults to 0.05
+
+        ``max_backoff``
+            maximum delay, in seconds, before drawing - defaults to 1
+
+    ``retries`` counts the retries made and ``exhausted`` the writes that still
+    failed after max_attempts; both are also reported to New Relic, when it is
+    installed, as Custom/SavoryPie/WriteRetries and
+    Custom/SavoryPie/WriteRetriesExhausted.
+    """
+    def __init__(self, max_attempts=3, backoff=0.05, max_backoff=1.0):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def is_retryable(self, error):
+        if not isinstance(error, DatabaseError):
+            return False
+
+        # Django wraps the driver's exception
+        cause = getattr(error, '__cause__', None) or error
+        if getattr(cause, 'pgcode', None) in _RETRYABLE_SQLSTATES:
+            return True
+        args = getattr(cause, 'args', ())
+        if args and args[0] in _RETRYABLE_MYSQL_ERRORS:
+            return True
+        return 'database is locked' in str(error)
+
+    def should_retry(self, error, attempt):
+        """
+        Returns whether a write that failed with error on its attempt-th run,
+        counting from 1, is run again, after sleeping for the backoff if so.
+        """
+        if not self.is_retryable(error):
+            return False
+
+        if attempt >= self.max_attempts:
+            with self._lock:
+                self.exhausted += 1
+            record_metric('Custom/SavoryPie/WriteRetriesExhausted', 1)
+            logger.warning('Giving up on write after %d attempts: %s', attempt, error)
+            return False
+
+        with self._lock:
+            self.retries += 1
+        record_metric('Custom/SavoryPie/WriteRetries', 1)
+        logger.info('Retrying write after attempt %d: %s', attempt, error)
+        time.sleep(self.get_delay(attempt))
+        return True
+
+    def get_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
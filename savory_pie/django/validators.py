@@ -1,6 +1,11 @@
 import collections
 import datetime
+import operator
 import re
+import unicodedata
+
+from django.db.models import Q
+
 import savory_pie
 
 
@@ -10,6 +15,100 @@ class ValidationError(Exception):
         self.errors = errors
 
 
+class SourceDictList(list):
+    """
+    List of source dicts for an iterable field that remembers the dict it was
+    found in, since a RelatedManagerField validator might want to examine it.
+    """
+    def __init__(self, source_dicts, parent_dict):
+        self[:] = source_dicts
+        self.parent_dict = parent_dict
+
+
+_ValidationStep = collections.namedtuple(
+    '_ValidationStep',
+    ['field', 'attribute', 'public_key', 'validators', 'validate_resource']
+)
+
+_ValidationPlan = collections.namedtuple('_ValidationPlan', ['steps', 'validators'])
+
+_validation_plans = {}
+
+
+def _as_tuple(validators):
+    if not validators:
+        return ()
+    elif isinstance(validators, collections.Iterable):
+        return tuple(validators)
+    else:
+        return (validators,)
+
+
+def _compile_validation_plan(formatter, resource):
+    """
+    Flattens the fields and validators of a resource into the steps run by
+    validate, so the field structure is not re-derived on every request.
+    """
+    steps = []
+    fields = getattr(resource, 'fields', None)
+    if isinstance(fields, collections.Iterable):
+        for field in fields:
+            try:
+                name = field.name
+            except Exception:
+                continue
+
+            validate_resource = getattr(field, 'validate_resource', None)
+            validators = _as_tuple(getattr(field, 'validator', None))
+            if getattr(validate_resource, 'im_func', None) is savory_pie.fields.AttributeField.validate_resource.im_func:
+                # AttributeField.validate_resource only re-runs the field's validators
+                validate_resource = None
+
+            steps.append(_ValidationStep(
+                field=field,
+                attribute=name,
+                public_key=formatter.convert_to_public_property(name),
+                validators=validators,
+                validate_resource=validate_resource,
+            ))
+
+    validators = getattr(resource, 'validators', None)
+    if not isinstance(validators, collections.Iterable):
+        validators = ()
+    return _ValidationPlan(steps=tuple(steps), validators=tuple(validators))
+
+
+def get_validation_plan(ctx, resource):
+    """
+    Returns the compiled validation plan for a resource (a ModelResource class
+    or instance).  Plans are cached per resource class and formatter class;
+    instances which override fields or validators get an uncached plan.
+    """
+    resource_class = resource if isinstance(resource, type) else type(resource)
+    instance_dict = getattr(resource, '__dict__', {}) if resource is not resource_class else {}
+    if 'fields' in instance_dict or 'validators' in instance_dict:
+        return _compile_validation_plan(ctx.formatter, resource)
+
+    plan_key = (resource_class, type(ctx.formatter))
+    plan = _validation_plans.get(plan_key)
+    if plan is None:
+        plan = _validation_plans[plan_key] = _compile_validation_plan(ctx.formatter, resource)
+    return plan
+
+
+def _is_unchanged(ctx, model, attribute, value):
+    try:
+        orig_value = getattr(model, attribute, None)
+        if orig_value is None or orig_value == value:
+            return orig_value == value
+        elif type(orig_value) is type(value):
+            # converting to the type value already has would not change it
+            return False
+        return orig_value == ctx.formatter.to_python_value(type(orig_value), value)
+    except Exception:
+        return False
+
+
 def validate(ctx, key, resource, source_dict):
     """
     Descend through a resource, including its fields and any related resources
@@ -36,50 +135,64 @@ def validate(ctx, key, resource, source_dict):
         validation errors
 
     """
+    return validate_all(ctx, [(key, resource, source_dict)])
+
+
+def validate_all(ctx, items):
+    """
+    Validates several (key, resource, source_dict) items together, returning
+    one merged error dict.  Database-backed checks queued by the validators of
+    every item are run together once all the items have been visited, so checks
+    against the same model share a single query.
+    """
+    checks = getattr(ctx, 'uniqueness_checks', None)
+    # Nested calls leave running the queued checks to the outermost one
+    owner = checks is None
+    if owner:
+        checks = ctx.uniqueness_checks = UniquenessChecks()
+
+    try:
+        error_dict = {}
+        for key, resource, source_dict in items:
+            for error_key, errors in _validate(ctx, key, resource, source_dict).items():
+                if error_key in error_dict:
+                    errors = error_dict[error_key] + errors
+                error_dict[error_key] = errors
+        if owner:
+            checks.run(error_dict)
+    finally:
+        if owner:
+            ctx.uniqueness_checks = None
+    return error_dict
+
+
+def _validate(ctx, key, resource, source_dict):
     key = ctx.formatter.convert_to_public_property(key)
     error_dict = {}
     if source_dict and resource:
-        if hasattr(resource, 'fields') and \
-           isinstance(resource.fields, collections.Iterable):
-            for field in resource.fields:
-                if not hasattr(field, 'name'):
-                    continue
-
-                fieldname = ctx.formatter.convert_to_public_property(field.name)
-                if fieldname in source_dict:
-                    value = source_dict[fieldname]
-                    if isinstance(value, list):
-                        # RelatedManagerField validator might want to examine parent dict
-                        class SourceDictList(list):
-                            def __init__(self, source_dicts, parent_dict):
-                                self[:] = source_dicts
-                                self.parent_dict = parent_dict
-
-                        value = SourceDictList(value, source_dict)
-
-                    # ignore validation if value hasn't changed
-                    if hasattr(resource, 'model'):
-                        try:
-                            orig_value = getattr(resource.model, field.name, None)
-                            if orig_value == ctx.formatter.to_python_value(type(orig_value), value):
-                                continue
-                        except Exception:
-                            pass
-
-                    # attempt to validate field
-                    if hasattr(field, 'validator') and field.validator:
-                        if isinstance(field.validator, collections.Iterable):
-                            for validator in field.validator:
-                                validator.find_errors(error_dict, ctx, key, resource, field, value)
-                        else:
-                            field.validator.find_errors(error_dict, ctx, key, resource, field, value)
-                    if hasattr(field, 'validate_resource'):
-                        error_dict.update(field.validate_resource(ctx, key, resource, value))
-
-        if hasattr(resource, 'validators') and \
-           isinstance(resource.validators, collections.Iterable):
-            for validator in resource.validators:
-                validator.find_errors(error_dict, ctx, key, resource, source_dict)
+        plan = get_validation_plan(ctx, resource)
+        has_model = hasattr(resource, 'model')
+        model = getattr(resource, 'model', None)
+
+        for step in plan.steps:
+            if step.public_key not in source_dict:
+                continue
+
+            value = source_dict[step.public_key]
+            if isinstance(value, list):
+                value = SourceDictList(value, source_dict)
+
+            # ignore validation if value hasn't changed
+            if has_model and _is_unchanged(ctx, model, step.attribute, value):
+                continue
+
+            for validator in step.validators:
+                validator.find_errors(error_dict, ctx, key, resource, step.field, value)
+            if step.validate_resource is not None:
+                error_dict.update(step.validate_resource(ctx, key, resource, value))
+
+        for validator in plan.validators:
+            validator.find_errors(error_dict, ctx, key, resource, source_dict)
     return error_dict
 
 
@@ -364,7 +477,58 @@ class RequiredTogetherValidator(ResourceValidator):
             self._add_error(error_dict, key, self.error_message)
 
 
-class UniqueTogetherValidator(ResourceValidator):
+class _UniqueFieldsValidator(ResourceValidator):
+    """
+    Shared machinery for validators which check proposed field values against
+    the rows already in the database.  Rather than querying directly, they queue
+    their checks on the context's UniquenessChecks, which runs them at the end
+    of validation.
+    """
+
+    def _find_filters(self, error_dict, ctx, key, resource, source_dict):
+        """
+        Returns a list of single lookup dicts, one per field, or None if the
+        check cannot (or need not) be made.
+        """
+        filters = []
+        for attr in self._fields:
+            public_attr = ctx.formatter.convert_to_public_property(attr)
+            if self.null and source_dict.get(public_attr) is None:
+                return None
+            elif public_attr not in source_dict:
+                self._add_error(error_dict, key, 'Cannot find field "' + attr + '"')
+                return None
+
+            for field in resource.fields:
+                if attr == getattr(field, 'name', None):
+                    try:
+                        if field.__class__ == savory_pie.django.fields.SubModelResourceField:
+                            if 'resourceUri' in source_dict[public_attr]:
+                                pk = source_dict[public_attr]['resourceUri'].split('/')[-1]
+                                filters.append({'{}__pk'.format(attr): pk})
+                            elif 'name' in source_dict[public_attr]:
+                                filters.append({'{}__name'.format(attr): source_dict[public_attr]['name']})
+                            else:
+                                #TODO allow lookup by fields other than id/name?
+                                return None
+                        elif issubclass(field.__class__, savory_pie.django.fields.AttributeField):
+                            filters.append({attr: source_dict[public_attr]})
+                    except Exception:
+                        pass
+        return filters
+
+    def _add_check(self, error_dict, ctx, key, check):
+        checks = getattr(ctx, 'uniqueness_checks', None)
+        if checks is not None:
+            checks.add(check)
+        else:
+            # Called outside of validate, so nothing else will run the check
+            checks = UniquenessChecks()
+            checks.add(check)
+            checks.run(error_dict)
+
+
+class UniqueTogetherValidator(_UniqueFieldsValidator):
     """
     Test a tuple of fields to ensure their proposed values represent a unique set
     within the database. This validator is similar to Django ORM's 'unique together'
@@ -379,6 +543,15 @@ class UniqueTogetherValidator(ResourceValidator):
         ``error_message``
             optional: the message to appear in the error dictionary if this
             condition is not met
+
+        ``constraint``
+            optional: set when the fields are backed by a unique index in the
+            database -- either True, or the name of the index. No query is made
+            up front; instead the ModelResource saves inside a savepoint and an
+            IntegrityError raised by that index is reported as this validator's
+            error. When True, the error is recognized by the exact set of columns
+            it lists, as SQLite and PostgreSQL do; MySQL only names the index,
+            so give the name there.
     """
 
     json_name = 'unique_together'
@@ -386,52 +559,54 @@ class UniqueTogetherValidator(ResourceValidator):
     error_message = 'This set of fields must be unique.'
 
     def __init__(self, *args, **kwargs):
+        self.constraint = kwargs.pop('constraint', None)
         kwargs['fields'] = ','.join(args)
         super(UniqueTogetherValidator, self).__init__(**kwargs)
         self._fields = args
 
     def find_errors(self, error_dict, ctx, key, resource, source_dict):
-        filters = []
-        for attr in self._fields:
-            public_attr = ctx.formatter.convert_to_public_property(attr)
-            if self.null and source_dict.get(public_attr) is None:
-                return
-            elif public_attr not in source_dict:
-                self._add_error(error_dict, key, 'Cannot find field "' + attr + '"')
-                return
-
-            for field in resource.fields:
-                if attr == getattr(field, 'name', None):
-                    try:
-                        if field.__class__ == savory_pie.django.fields.SubModelResourceField:
-                            if 'resourceUri' in source_dict[public_attr]:
-                                pk = source_dict[public_attr]['resourceUri'].split('/')[-1]
-                                filters.append({'{}__pk'.format(attr): pk})
-                            elif 'name' in source_dict[public_attr]:
-                                filters.append({'{}__name'.format(attr): source_dict[public_attr]['name']})
-                            else:
-                                #TODO allow lookup by fields other than id/name?
-                                return
-                        elif issubclass(field.__class__, savory_pie.django.fields.AttributeField):
-                            filters.append({attr: source_dict[public_attr]})
-                    except Exception:
-                        pass
+        if self.constraint:
+            # Left to the database, see find_integrity_errors
+            return
 
+        filters = self._find_filters(error_dict, ctx, key, resource, source_dict)
         if filters and hasattr(resource, 'model'):
+            include = {}
+            for f in filters:
+                include.update(f)
+            # re-saving an existing object must not conflict with itself
+            self._add_check(error_dict, ctx, key, UniquenessCheck(
+                model_class=resource.model.__class__,
+                include=include,
+                exclude={},
+                instance_pk=resource.model.pk,
+                key=key,
+                error_message=self.error_message,
+            ))
+
+    def find_integrity_errors(self, error_dict, ctx, key, resource, error):
+        """
+        Adds this validator's error to error_dict if the IntegrityError raised
+        while saving resource came from its constraint.  Returns True if it did.
+        """
+        message = unicode(error)
+        if isinstance(self.constraint, basestring):
+            # The quoted name, not one it is part of
+            violated = re.search(u'[\'"`]{0}[\'"`]'.format(re.escape(self.constraint)), message) is not None
+        else:
+            model_class = resource.model.__class__
             try:
-                qset = resource.model.__class__.objects.all()
-                for f in filters:
-                    qset = qset.filter(**f)
-                if len(qset):
-                    # if validation fails because we're re-saving an existing object, ignore
-                    if len(qset) == 1 and resource.model.pk and qset[0].pk == resource.model.pk:
-                        return
-                    self._add_error(error_dict, key, self.error_message)
+                columns = set(model_class._meta.get_field(attr).column for attr in self._fields)
             except Exception:
-                pass
+                return False
+            violated = _violated_columns(message) == columns
 
+        if violated:
+            self._add_error(error_dict, key, self.error_message)
+        return violated
 
-class UniquePairedFieldValidator(ResourceValidator):
+
+class UniquePairedFieldValidator(_UniqueFieldsValidator):
     """
     Test a pair of fields (a, b), such that for a given a, only one b can exist. However,
     this _unique_ combination of fields can exist unlimited times.
@@ -457,39 +632,209 @@ class UniquePairedFieldValidator(ResourceValidator):
         self._fields = args
 
     def find_errors(self, error_dict, ctx, key, resource, source_dict):
-        filters = []
-        for attr in self._fields:
-            public_attr = ctx.formatter.convert_to_public_property(attr)
-            if self.null and source_dict.get(public_attr) is None:
-                return
-            elif public_attr not in source_dict:
-                self._add_error(error_dict, key, 'Cannot find field "' + attr + '"')
-                return
+        filters = self._find_filters(error_dict, ctx, key, resource, source_dict)
+        if filters and len(filters) > 1 and hasattr(resource, 'model'):
+            self._add_check(error_dict, ctx, key, UniquenessCheck(
+                model_class=resource.model.__class__,
+                include=filters[0],
+                exclude=filters[1],
+                instance_pk=None,
+                key=key,
+                error_message=self.error_message,
+            ))
+
+
+UniquenessCheck = collections.namedtuple(
+    'UniquenessCheck',
+    ['model_class', 'include', 'exclude', 'instance_pk', 'key', 'error_message']
+)
+"""
+A pending uniqueness check: it fails when a row of model_class matches every
+lookup in include, does not match every lookup in exclude and is not the row
+whose pk is instance_pk.
+"""
+
+
+class UniquenessChecks(object):
+    """
+    Request-scoped collector for the database-backed checks queued by
+    UniqueTogetherValidator and UniquePairedFieldValidator.  All the checks
+    against one model are answered by a single query, whose rows are then
+    matched back to the checks (and their error keys) in Python.  A row equal
+    to none of the checks was returned through a case or accent insensitive
+    collation, so it is matched back with strings compared case and accent
+    folded.
+    """
 
-            for field in resource.fields:
-                if attr == getattr(field, 'name', None):
-                    try:
-                        if field.__class__ == savory_pie.django.fields.SubModelResourceField:
-                            if 'resourceUri' in source_dict[public_attr]:
-                                pk = source_dict[public_attr]['resourceUri'].split('/')[-1]
-                                filters.append({'{}__pk'.format(attr): pk})
-                            elif 'name' in source_dict[public_attr]:
-                                filters.append({'{}__name'.format(attr): source_dict[public_attr]['name']})
-                            else:
-                                #TODO allow lookup by fields other than id/name?
-                                return
-                        elif issubclass(field.__class__, savory_pie.django.fields.AttributeField):
-                            filters.append({attr: source_dict[public_attr]})
-                    except Exception:
-                        pass
+    def __init__(self):
+        self._checks = []
 
-        if filters and hasattr(resource, 'model'):
+    def add(self, check):
+        self._checks.append(check)
+
+    def run(self, error_dict):
+        """
+        Runs the queued checks, adding errors for the failing ones to error_dict.
+        """
+        checks_by_model = collections.OrderedDict()
+        for check in self._checks:
+            checks_by_model.setdefault(check.model_class, []).append(check)
+        self._checks = []
+
+        for model_class, checks in checks_by_model.items():
+            try:
+                coercers = self._coercers(model_class, checks)
+            except Exception:
+                # Not a lookup we can compare in Python, fall back to a query per check
+                payload = {}
+                for check in checks:
+                    if _conflicts_within_payload(payload, check, check.include, check.exclude) or self._run_single(check):
+                        _add_error(error_dict, check.key, check.error_message)
+            else:
+                self._run_batch(error_dict, model_class, checks, coercers)
+
+    def _coercers(self, model_class, checks):
+        lookups = set()
+        for check in checks:
+            lookups.update(check.include)
+            lookups.update(check.exclude)
+        return dict((lookup, _lookup_field(model_class, lookup).to_python) for lookup in lookups)
+
+    def _run_single(self, check):
+        try:
+            queryset = check.model_class.objects.filter(**check.include)
+            if check.exclude:
+                queryset = queryset.exclude(**check.exclude)
+            if check.instance_pk is not None:
+                queryset = queryset.exclude(pk=check.instance_pk)
+            return queryset.exists()
+        except Exception:
+            return False
+
+    def _run_batch(self, error_dict, model_class, checks, coercers):
+        def coerce(lookups):
+            return dict((lookup, coercers[lookup](value)) for lookup, value in lookups.items())
+
+        pending = []
+        for check in checks:
             try:
-                qset = resource.model.__class__.objects.filter(**filters[0]).exclude(**filters[1])
-                if len(qset):
-                    self._add_error(error_dict, key, self.error_message)
+                pending.append((check, coerce(check.include), coerce(check.exclude)))
             except Exception:
+                # A value the database could never match
                 pass
+        if not pending:
+            return
+
+        include_lookups = set(tuple(sorted(include)) for _, include, _ in pending)
+        if len(include_lookups) == 1 and len(include_lookups.copy().pop()) == 1:
+            lookup = include_lookups.pop()[0]
+            q = Q(**{lookup + '__in': set(include[lookup] for _, include, _ in pending)})
+        else:
+            q = reduce(operator.or_, [Q(**include) for _, include, _ in pending])
+
+        try:
+            rows = list(model_class.objects.filter(q).values('pk', *coercers.keys()))
+        except Exception:
+            return
+
+        # Every row returned matches some check, exactly or else up to the collation
+        folded_rows = set(
+            index for index, row in enumerate(rows)
+            if not any(_matches(row, include) for _, include, _ in pending)
+        )
+
+        def conflicts(index, check, include, exclude):
+            row = rows[index]
+            fold = index in folded_rows
+            if row['pk'] == check.instance_pk or not _matches(row, include, fold):
+                return False
+            return not (exclude and _matches(row, exclude, fold))
+
+        payload = {}
+        for check, include, exclude in pending:
+            failed = any(conflicts(index, check, include, exclude) for index in xrange(len(rows)))
+            # Evaluated for every check, so later ones see this one
+            if _conflicts_within_payload(payload, check, include, exclude) or failed:
+                _add_error(error_dict, check.key, check.error_message)
+
+
+def _matches(values, lookups, fold=False):
+    if fold:
+        return all(_fold(values[lookup]) == _fold(value) for lookup, value in lookups.items())
+    return all(values[lookup] == value for lookup, value in lookups.items())
+
+
+def _fold(value):
+    if not isinstance(value, basestring):
+        return value
+    if isinstance(value, str):
+        value = value.decode('utf-8', 'replace')
+    return u''.join(char for char in unicodedata.normalize('NFKD', value) if not unicodedata.combining(char)).lower()
+
+
+def _conflicts_within_payload(payload, check, include, exclude):
+    """
+    Whether check conflicts with one checked before it for the same payload, as
+    it would with the saved row of that earlier object: all objects of a
+    payload are validated before any of them is saved.  payload collects the
+    (instance_pk, exclude) of the checks seen, by their include and the
+    lookups of their exclude.
+    """
+    seen = payload.setdefault((tuple(sorted(include.items())), tuple(sorted(exclude))), [])
+    failed = any(
+        not (exclude and _matches(other_exclude, exclude))
+        for other_pk, other_exclude in seen
+        if check.instance_pk is None or other_pk != check.instance_pk
+    )
+    seen.append((check.instance_pk, exclude))
+    return failed
+
+
+# Column lists of unique violations: PostgreSQL, then SQLite 3.8.2 and later, then earlier SQLite
+_VIOLATED_COLUMNS = [
+    re.compile(r'Key \(([^)]*)\)='),
+    re.compile(r'UNIQUE constraint failed: (.*)$', re.MULTILINE),
+    re.compile(r'columns? (.*?) (?:is|are) not unique'),
+]
+
+
+def _violated_columns(message):
+    """
+    The set of columns a unique violation's message lists, or None.
+    """
+    for pattern in _VIOLATED_COLUMNS:
+        match = pattern.search(message)
+        if match:
+            # SQLite qualifies the columns with their table
+            return set(
+                column.strip().strip('"`').rpartition('.')[2].strip('"`')
+                for column in match.group(1).split(',')
+            )
+    return None
+
+
+def _lookup_field(model_class, lookup):
+    """
+    Resolves an exact-match lookup like 'name', 'owner__pk' or 'owner__name'
+    to the model field whose values it compares.
+    """
+    opts = model_class._meta
+    field = None
+    for part in lookup.split('__'):
+        if field is not None:
+            opts = field.rel.to._meta
+        field = opts.pk if part == 'pk' else opts.get_field(part)
+
+    while getattr(field, 'rel', None) is not None:
+        field = field.rel.get_related_field()
+    return field
+
+
+def _add_error(error_dict, key, error):
+    if key in error_dict:
+        error_dict[key].append(error)
+    else:
+        error_dict[key] = [error]
 
 
 ########## Field validators ############
@@ -1,28 +1,109 @@
+import calendar
+import copy
 import functools
+import json
 import logging
+import os
 import re
+import threading
+from collections import OrderedDict
+from cStringIO import StringIO
+from itertools import imap, izip
+from multiprocessing.pool import ThreadPool
 
-from django.db import transaction
+from django.db import close_old_connections, connections, transaction
 from django.http import HttpResponse, StreamingHttpResponse, HttpRequest
+from django.utils import timezone
 from django.utils.datastructures import MultiValueDict
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.text import compress_sequence, compress_string
 
 from savory_pie.context import APIContext
 from savory_pie.django import validators
-from savory_pie.errors import AuthorizationError, PreConditionError, MethodNotAllowedError
+from savory_pie.django.compiler import compile_api
+from savory_pie.django.resources import ModelResource, QuerySetResource
+from savory_pie.errors import AuthorizationError, PreConditionError, MethodNotAllowedError, RequestBodyError
 from savory_pie.formatters import JSONFormatter
 from savory_pie.newrelic import set_transaction_name
-from savory_pie.helpers import get_sha1, process_get_request, process_post_request, process_put_request, process_delete_request
+from savory_pie.helpers import (
+    get_cache_validators,
+    get_sha1,
+    process_get_request,
+    process_post_request,
+    process_put_request,
+    process_delete_request,
+)
+from savory_pie.resources import EmptyParams, _ParamsImpl
 
 logger = logging.getLogger(__name__)
 
+#: Cookie keeping a client's reads on the default database right after its writes
+READ_PRIMARY_COOKIE = 'savory_pie_read_primary'
 
-def batch_api_view(root_resource, base_regex):
+
+def batch_api_view(root_resource, base_regex, precompile=False, max_workers=None, transaction_mode=None,
+                   streaming=False, formatter=None, compression_threshold=None, query_monitor=None):
     """
     View function factory that provides accessing to the resource tree
     rooted at root_resource.
 
     The produced function needs to be bound into URLs as r'^some/base/path/(.*)$'
     base_regex is the regex to the sub resources r'^some/base/path/(?P<base_resource>.*)$'
+
+    If precompile is True, the tree is compiled with
+    :func:`savory_pie.django.compiler.compile_api` right away.
+
+    If max_workers is greater than 1, consecutive GET sub-requests run
+    concurrently on a pool of that many threads, each with its own database
+    connection.  Other sub-requests still run one at a time, in order, and
+    GETs never run concurrently with them.  Concurrent GETs only see committed
+    data, so do not combine this with a transaction spanning the whole request.
+
+    By default every write sub-request is committed on its own.  With a
+    transaction_mode the whole batch runs in one transaction, with a savepoint
+    per write sub-request:
+
+        ``'savepoint'``
+            a failed write is rolled back to its savepoint, the rest are
+            committed together at the end
+
+        ``'atomic'``
+            if any write fails, the whole batch is rolled back and the
+            response is flagged with rolledBack
+
+    Sub-requests are never run concurrently in a transaction_mode.
+
+    If streaming is True, the response is streamed and every sub-result is
+    written out as soon as it and the ones before it are complete.  A streamed
+    response has no ETag.  Streaming does not apply in a transaction_mode,
+    where the outcome of the batch is only known at the end.
+
+    A sub-request may carry an id, echoed in its result.  Later sub-requests
+    can refer to that result within their uri and body as ``${id.path}``,
+    where path is a dotted path into the result, e.g.
+    ``${parent.location}/children`` or ``${parent.data.name}``.  A value that
+    is just a reference takes the referenced value as is.  A sub-request with
+    references waits for everything before it to complete; it fails with 424
+    if the result it refers to is not a success, and with 400 if the reference
+    does not resolve.
+
+    Sub-requests may carry ifNoneMatch and ifMatch, handled like the
+    If-None-Match and If-Match headers: an unchanged GET gets a 304 result
+    without data, and a PUT whose resource changed gets a 412 result.
+
+    formatter is an optional :class:`savory_pie.formatters.JSONFormatter`,
+    e.g. one with request body limits.  By default the whole body is read
+    before any sub-request runs.  With request body limits, or in a
+    transaction_mode, sub-requests are dispatched as they are read: when the
+    rest of the body turns out malformed or too large, those before have
+    already run, unless a transaction_mode rolls them back, and a streamed
+    response is cut short.
+
+    compression_threshold enables gzip compression of the response as for
+    :func:`api_view`.
+
+    query_monitor accounts for the queries of the whole batch as for
+    :func:`api_view`; sub-requests are then never run concurrently.
     """
     # Hide this import from sphinx
     from django.views.decorators.csrf import csrf_exempt
@@ -30,6 +111,9 @@ def batch_api_view(root_resource, base_regex):
     if root_resource.resource_path is None:
         root_resource.resource_path = ''
 
+    if precompile:
+        compile_api(root_resource)
+
     # TODO: Make this a setter
     root_resource.set_base_regex(base_regex)
 
@@ -53,18 +137,254 @@ def batch_api_view(root_resource, base_regex):
                 return base_url
         return ''
 
+    if transaction_mode not in (None, 'savepoint', 'atomic'):
+        raise ValueError('unknown transaction_mode {0!r}'.format(transaction_mode))
+
+    # Other threads would not see the writes of an open transaction, nor record their queries
+    thread_pool = _ThreadPool(None if transaction_mode or query_monitor else max_workers)
+    write_transaction = _savepoint_batch if transaction_mode else _database_transaction_batch
+
+    def dispatch_in_transaction(ctx, items, host):
+        methods = []
+
+        def recorded(items):
+            for item in items:
+                methods.append(item[0][0].method)
+                yield item
+
+        try:
+            with transaction.atomic():
+                result = dispatch_all(recorded(items), host)
+                if transaction_mode == 'atomic' and any(
+                        not 200 <= item.get('status', 500) < 300
+                        for item, method in zip(result, methods)
+                        if method != 'GET'):
+                    raise _BatchRollback(result)
+        except _BatchRollback, e:
+            return {'data': e.result, ctx.formatter.convert_to_public_property('rolled_back'): True}
+        return {'data': result}
+
+    def dispatch_all(items, host):
+        return list(iter_results(items, host))
+
+    def stream_envelope(ctx, items, host):
+        yield '{"data": ['
+        for index, result in enumerate(iter_results(items, host)):
+            if index:
+                yield ', '
+            yield _formatted(ctx, result)
+        yield ']}'
+
+    def iter_results(items, host):
+        """
+        Takes the (sub-request, id) items as they are read, and yields the
+        result of every sub-request, in order, as soon as it and the ones
+        before it are complete.
+        """
+        # Indexed like the items; entries are dropped once their result is out
+        sub_requests = []
+        ids = []
+        results_by_id = {}
+        gets = []
+
+        def completed(indexes, results):
+            for index, result in izip(indexes, results):
+                sub_requests[index] = None
+                # The result of a duplicate is a copy of one that may carry its own id
+                result.pop('id', None)
+                if ids[index] is not None:
+                    result['id'] = ids[index]
+                    results_by_id[ids[index]] = result
+                yield result
+
+        for index, (sub_request, sub_request_id) in enumerate(items):
+            sub_requests.append(sub_request)
+            ids.append(sub_request_id)
+            if _has_references(sub_request[1:]):
+                for result in completed(gets, iter_get_results(sub_requests, gets, host)):
+                    yield result
+                gets = []
+                try:
+                    sub_request = sub_requests[index] = resolve_references(sub_request, results_by_id)
+                except _UnresolvedReference, e:
+                    for result in completed([index], [{
+                        'uri': sub_request[1],
+                        'status': e.status,
+                        'validation_errors': [e.message]
+                    }]):
+                        yield result
+                    continue
+
+            if sub_request[0].method == 'GET':
+                gets.append(index)
+            else:
+                for result in completed(gets, iter_get_results(sub_requests, gets, host)):
+                    yield result
+                gets = []
+                for result in completed([index], [resource_dispatch(*(sub_request + (host,)))]):
+                    yield result
+        for result in completed(gets, iter_get_results(sub_requests, gets, host)):
+            yield result
+
+    def resolve_references(sub_request, results_by_id):
+        request, uri, data = sub_request
+        uri = _resolve_references(uri, results_by_id)
+        if not isinstance(uri, basestring):
+            raise _UnresolvedReference(400, 'uri must resolve to a string')
+        request.path = uri
+        return request, uri, _resolve_references(data, results_by_id)
+
+    def iter_get_results(sub_requests, indexes, host):
+        if not indexes:
+            return
+        jobs, duplicates = plan_gets(sub_requests, indexes, host)
+        copies = dict((index, first_index) for first_index, copy_indexes in duplicates.items() for index in copy_indexes)
+        ready = {}
+        position = 0
+        for (job_indexes, function, args), job_results in izip(jobs, run_jobs(jobs)):
+            ready.update(izip(job_indexes, job_results))
+            while position < len(indexes):
+                index = indexes[position]
+                if index in copies:
+                    result = dict(ready[copies[index]])
+                elif index not in ready:
+                    break
+                elif index in duplicates:
+                    result = ready[index]
+                else:
+                    result = ready.pop(index)
+                position += 1
+                yield result
+
+    def plan_gets(sub_requests, indexes, host):
+        """
+        Splits a run of GET sub-requests into jobs, each a tuple of
+        (indexes, function, args) where function returns one result per index.
+        Detail GETs against the same QuerySetResource are read with a single
+        query, and exact duplicates are returned as {first index: [indexes]}.
+        """
+        jobs = []
+        first_indexes = {}
+        duplicates = {}
+        collections = OrderedDict()
+        parents = {}
+        for index in indexes:
+            request, uri, data = sub_requests[index]
+            identity = (uri, json.dumps(data, sort_keys=True), request.META.get('HTTP_IF_NONE_MATCH'))
+            if identity in first_indexes:
+                duplicates.setdefault(first_indexes[identity], []).append(index)
+                continue
+            first_indexes[identity] = index
+
+            detail = _coalescable_detail(request, uri, data, host, parents)
+            if detail is None:
+                jobs.append(([index], _dispatch_one, sub_requests[index] + (host,)))
+            else:
+                parent_path, key = detail
+                collections.setdefault(parent_path, []).append((index, key))
+
+        for parent_path, items in collections.items():
+            if len(items) == 1:
+                index = items[0][0]
+                jobs.append(([index], _dispatch_one, sub_requests[index] + (host,)))
+            else:
+                jobs.append((
+                    [item[0] for item in items],
+                    coalesced_dispatch,
+                    (parents[parent_path], [sub_requests[item[0]] + (item[1], host) for item in items])
+                ))
+        return jobs, duplicates
+
+    def run_jobs(jobs):
+        if thread_pool and len(jobs) > 1:
+            return thread_pool.imap(run_job_in_thread, jobs)
+        return imap(run_job, jobs)
+
+    def run_job(job):
+        indexes, function, args = job
+        return function(*args)
+
+    def run_job_in_thread(job):
+        # As at the start of a request, drop connections that went stale
+        close_old_connections()
+        try:
+            return run_job(job)
+        finally:
+            # Pool threads outlive requests, so nothing would close their connections
+            for connection in connections.all():
+                connection.close()
+
+    def _dispatch_one(request, uri, data, host):
+        return [resource_dispatch(request, uri, data, host)]
+
+    def _coalescable_detail(request, uri, data, host, parents):
+        """
+        Returns (collection path, key) when the sub-request is a plain detail
+        GET against a QuerySetResource that routes keys the standard way.
+        """
+        if data or '?' in uri:
+            return None
+        parent_path, _, key = compute_resource_path(uri, host).rstrip('/').rpartition('/')
+        if not parent_path or key == 'schema':
+            return None
+
+        if parent_path not in parents:
+            ctx = compute_context(parent_path, request, root_resource, formatter)
+            parents[parent_path] = ctx.resolve_resource_path(parent_path)
+        parent = parents[parent_path]
+
+        if not isinstance(parent, QuerySetResource) or \
+                type(parent).get_child_resource.im_func is not QuerySetResource.get_child_resource.im_func or \
+                type(parent).read_queryset.im_func is not QuerySetResource.read_queryset.im_func or \
+                parent.resource_class.get_from_queryset.im_func is not ModelResource.get_from_queryset.im_func:
+            return None
+        try:
+            parent.resource_class.published_key[1](key)
+        except (TypeError, ValueError):
+            return None
+        return parent_path, key
+
+    def coalesced_dispatch(queryset_resource, items):
+        resource_class = queryset_resource.resource_class
+        attr, type_ = resource_class.published_key
+        contexts = [
+            compute_context(compute_resource_path(uri, host), request, root_resource, formatter)
+            for request, uri, data, key, host in items
+        ]
+
+        # Read like get_child_resource would
+        queryset = queryset_resource.read_queryset(contexts[0]).filter(
+            **{attr + '__in': [type_(item[3]) for item in items]}
+        )
+        models = dict(
+            (str(getattr(model, attr)), model)
+            for model in queryset_resource.prepare_queryset(contexts[0], queryset)
+        )
+
+        results = []
+        for ctx, (request, uri, data, key, host) in zip(contexts, items):
+            model = models.get(str(type_(key)))
+            if model is None:
+                results.append({'uri': uri, 'status': 404})
+            else:
+                resource = queryset_resource.to_resource(model)
+                results.append(dispatch_resource(ctx, resource, request, uri, {}))
+        return results
+
     def resource_dispatch(request, uri, data, host):
 
         resource_path = compute_resource_path(uri, host)
-        ctx = compute_context(resource_path, request, root_resource)
+        ctx = compute_context(resource_path, request, root_resource, formatter)
 
         resource = ctx.resolve_resource_path(resource_path)
 
-        resource_result = {'uri': uri}
-
         if resource is None:
-            resource_result['status'] = 404
-            return resource_result
+            return {'uri': uri, 'status': 404}
+
+        return dispatch_resource(ctx, resource, request, uri, data)
+
+    def dispatch_resource(ctx, resource, request, uri, data):
+        resource_result = {'uri': uri}
 
         try:
             if request.method == 'GET':
@@ -80,8 +400,9 @@ def batch_api_view(root_resource, base_regex):
                     _put_request_for_batch(ctx, resource, data)
                 )
             elif request.method == 'DELETE':
-                process_delete_request(ctx, resource)
-                resource_result['status'] = 200
+                resource_result.update(
+                    _delete_request_for_batch(ctx, resource, data)
+                )
             else:
                 raise MethodNotAllowedError(method=request.method)
         except MethodNotAllowedError:
@@ -107,14 +428,24 @@ def batch_api_view(root_resource, base_regex):
         resource_result = {}
         get_data = MultiValueDict()
         get_data.update(data)
+        etag = None
+        if 'GET' in resource.allowed_methods:
+            etag = get_cache_validators(ctx, resource, _ParamsImpl(get_data))[0]
+            if _is_not_modified(ctx.request, etag, None):
+                return {'status': 304, 'etag': etag}
+
         content_dict = process_get_request(ctx, resource, get_data)
+        if etag is None:
+            etag = get_sha1(ctx, content_dict)
+            if _is_not_modified(ctx.request, etag, None):
+                return {'status': 304, 'etag': etag}
         resource_result['status'] = 200
-        resource_result['etag'] = get_sha1(ctx, content_dict)
+        resource_result['etag'] = etag
         resource_result['data'] = content_dict
 
         return resource_result
 
-    @_database_transaction_batch
+    @write_transaction
     def _post_request_for_batch(ctx, resource, data):
         resource_result = {}
         new_resource = process_post_request(ctx, resource, data)
@@ -122,13 +453,18 @@ def batch_api_view(root_resource, base_regex):
         resource_result['location'] = ctx.build_resource_uri(new_resource)
         return resource_result
 
-    @_database_transaction_batch
+    @write_transaction
     def _put_request_for_batch(ctx, resource, data):
 
         resource_result = {}
         try:
 
-            content_dict = process_put_request(ctx, resource, data)
+            content_dict = process_put_request(
+                ctx,
+                resource,
+                data,
+                expected_hash=ctx.request.META.get('HTTP_IF_MATCH')
+            )
         except PreConditionError:
             resource_result['status'] = 412
         except KeyError, ke:
@@ -143,44 +479,153 @@ def batch_api_view(root_resource, base_regex):
 
         return resource_result
 
+    def _delete_request_for_batch(ctx, resource, data):
+        resource_result = {'status': 200}
+        content_dict = process_delete_request(ctx, resource)
+        if content_dict:
+            resource_result['data'] = content_dict
+        return resource_result
+
+    if transaction_mode:
+        _delete_request_for_batch = _savepoint_batch(_delete_request_for_batch)
+
+    def iter_items(ctx, request):
+        """
+        Yields the ((request, uri, body), id) of every sub-request as soon as
+        it is read from the body.
+        """
+        for resource_request in ctx.formatter.iter_items(request, 'data'):
+            method = resource_request['method']
+            uri = resource_request['uri']
+            body = resource_request.get('body', None)
+
+            sub_request = create_request(method, uri, request.user)
+            for condition in ('if_match', 'if_none_match'):
+                value = resource_request.get(ctx.formatter.convert_to_public_property(condition))
+                if value is not None:
+                    sub_request.META['HTTP_' + condition.upper()] = value
+
+            yield (sub_request, uri, body), resource_request.get('id', None)
+
     @csrf_exempt
     @set_transaction_name
     def view(request, resource_path):
 
-        ctx = compute_context(resource_path, request, root_resource)
+        ctx = compute_context(resource_path, request, root_resource, formatter)
         try:
             if resource_path or request.method != 'POST':
                 return _not_allowed_resource_method(ctx, root_resource, request, ['POST'])
 
-            data = ctx.formatter.read_from(request)
-            result = []
-            for resource_request in data.get('data', []):
-                method = resource_request['method']
-                uri = resource_request['uri']
-                body = resource_request.get('body', None)
-
-                resource_request = create_request(method, uri, request.user)
-
-                result.append(
-                    resource_dispatch(
-                        resource_request,
-                        uri,
-                        body,
-                        request.get_host()
-                    )
-                )
+            items = iter_items(ctx, request)
+            if not (transaction_mode or ctx.formatter.is_limited):
+                # Nothing runs unless the whole body is readable
+                items = list(items)
+            if transaction_mode:
+                content_dict = dispatch_in_transaction(ctx, items, request.get_host())
+            elif streaming:
+                ctx.streaming_response = True
+                content_dict = stream_envelope(ctx, items, request.get_host())
+            else:
+                content_dict = {'data': dispatch_all(items, request.get_host())}
 
-            return _content_success(ctx, None, request, {'data': result})
+            return _content_success(ctx, None, request, content_dict)
 
+        except RequestBodyError as e:
+            return _unreadable_body(ctx, request, e)
         except Exception:
             import traceback
             logger.exception('Caught Exception in API')
             return _internal_error(ctx, request, traceback.format_exc())
 
+    if query_monitor is not None:
+        view = _monitor_queries(view, query_monitor)
+    if compression_threshold is not None:
+        view = _compress_responses(view, compression_threshold)
     return view
 
 
-def compute_context(resource_path, request, root_resource):
+_REFERENCE = re.compile(r'\$\{([^}.]+)((?:\.[^}.]+)*)\}')
+
+
+class _UnresolvedReference(Exception):
+    def __init__(self, status, message):
+        super(_UnresolvedReference, self).__init__(message)
+        self.status = status
+
+
+def _has_references(value):
+    if isinstance(value, basestring):
+        return _REFERENCE.search(value) is not None
+    elif isinstance(value, dict):
+        return any(_has_references(item) for item in value.values())
+    elif isinstance(value, (list, tuple)):
+        return any(_has_references(item) for item in value)
+    return False
+
+
+def _resolve_references(value, results_by_id):
+    """
+    Substitutes the ${id.path} references within value with the results of
+    earlier batch sub-requests.
+    """
+    if isinstance(value, basestring):
+        match = _REFERENCE.match(value)
+        if match and match.end() == len(value):
+            return _referenced_value(match, results_by_id)
+        return _REFERENCE.sub(lambda match: unicode(_referenced_value(match, results_by_id)), value)
+    elif isinstance(value, dict):
+        return dict((key, _resolve_references(item, results_by_id)) for key, item in value.items())
+    elif isinstance(value, list):
+        return [_resolve_references(item, results_by_id) for item in value]
+    return value
+
+
+def _referenced_value(match, results_by_id):
+    name, path = match.groups()
+    try:
+        value = results_by_id[name]
+    except KeyError:
+        raise _UnresolvedReference(400, 'Unknown sub-request id {0}'.format(name))
+    if not 200 <= value.get('status', 500) < 300:
+        raise _UnresolvedReference(424, 'Sub-request {0} failed'.format(name))
+
+    for key in path.split('.')[1:]:
+        try:
+            value = value[int(key) if isinstance(value, list) else key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise _UnresolvedReference(400, 'Cannot resolve {0}'.format(match.group(0)))
+    return value
+
+
+class _ThreadPool(object):
+    """
+    Pool of max_workers threads, started on first use so that processes forked
+    after the view is created do not inherit a pool without threads.
+    """
+    def __init__(self, max_workers):
+        self.max_workers = max_workers if max_workers > 1 else 0
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __nonzero__(self):
+        return bool(self.max_workers)
+
+    def map(self, func, iterable):
+        return self._get_pool().map(func, iterable)
+
+    def imap(self, func, iterable):
+        return self._get_pool().imap(func, iterable)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPool(self.max_workers)
+                self._pid = os.getpid()
+            return self._pool
+
+
+def compute_context(resource_path, request, root_resource, formatter=None):
     full_path = _strip_query_string(request.get_full_path())
     if len(resource_path) == 0:
         base_path = full_path
@@ -190,19 +635,53 @@ def compute_context(resource_path, request, root_resource):
     ctx = APIContext(
         base_uri=request.build_absolute_uri(base_path),
         root_resource=root_resource,
-        formatter=JSONFormatter(),
+        formatter=formatter or JSONFormatter(),
         request=request
     )
 
     return ctx
 
 
-def api_view(root_resource):
+def api_view(root_resource, response_cache=None, precompile=False, formatter=None, compression_threshold=None,
+             read_database=None, read_primary_seconds=5, retry_policy=None, query_monitor=None):
     """
     View function factory that provides accessing to the resource tree
     rooted at root_resource.
 
     The produced function needs to be bound into URLs as r'^some/base/path/(.*)$'
+
+    response_cache is an optional :class:`savory_pie.django.cache.ResponseCache`
+    that GET responses are served from, and that successful writes invalidate.
+
+    If precompile is True, the tree is compiled with
+    :func:`savory_pie.django.compiler.compile_api` right away, so broken
+    definitions fail at startup and workers forked afterwards share the plans.
+
+    formatter is an optional :class:`savory_pie.formatters.JSONFormatter`
+    used instead of the default one, e.g. one limiting request bodies, which
+    are then rejected with a 400 or 413 as soon as a limit is exceeded.
+
+    If compression_threshold is set, responses of at least that many bytes
+    are gzipped for clients accepting it; streaming responses are always
+    compressed, incrementally.  The ETag is that of the uncompressed content,
+    whatever the encoding.
+
+    read_database is an optional database alias, typically of a read replica,
+    that QuerySetResources read from when handling a GET.  Writes stay on the
+    default database.  A successful write sets a cookie keeping the client's
+    GETs on the default database for read_primary_seconds, so it reads its
+    own writes despite replication lag.  GETs read from read_database are
+    served from response_cache, but do not fill it, nor the fragment caches
+    of resources without a version_attribute.
+
+    retry_policy is an optional :class:`savory_pie.django.retry.RetryPolicy`
+    re-running POSTs and PUTs whose transaction failed on a serialization
+    failure, deadlock or similar transient database error, against the
+    resource resolved afresh and without parsing the body again.
+
+    query_monitor is an optional :class:`savory_pie.django.queries.QueryMonitor`
+    counting the queries of every request and their time, and reporting the
+    fields issuing the same statement over and over.
     """
     # Hide this import from sphinx
     from django.views.decorators.csrf import csrf_exempt
@@ -210,11 +689,17 @@ def api_view(root_resource):
     if root_resource.resource_path is None:
         root_resource.resource_path = ''
 
+    if precompile:
+        compile_api(root_resource)
+
     @csrf_exempt
     @set_transaction_name
     def view(request, resource_path):
 
-        ctx = compute_context(resource_path, request, root_resource)
+        ctx = compute_context(resource_path, request, root_resource, formatter)
+        if read_database is not None and request.method == 'GET' and READ_PRIMARY_COOKIE not in request.COOKIES:
+            ctx.read_database = read_database
+        ctx.retry_policy = retry_policy
 
         try:
             resource = ctx.resolve_resource_path(resource_path)
@@ -223,25 +708,96 @@ def api_view(root_resource):
                 return _not_found(ctx, request)
 
             if request.method == 'GET':
-                return _process_get(ctx, resource, request)
+                return _process_get(ctx, resource, request, response_cache)
             elif request.method == 'POST':
-                return _process_post(ctx, resource, request)
+                response = _process_post(ctx, resource, request)
             elif request.method == 'PUT':
-                return _process_put(ctx, resource, request)
+                response = _process_put(ctx, resource, request)
             elif request.method == 'DELETE':
-                return _process_delete(ctx, resource, request)
+                response = _process_delete(ctx, resource, request)
             else:
                 return _not_allowed_method(ctx, resource, request)
+
+            if 200 <= response.status_code < 300:
+                if response_cache is not None:
+                    response_cache.invalidate(resource)
+                if read_database is not None and read_primary_seconds:
+                    response.set_cookie(READ_PRIMARY_COOKIE, '1', max_age=read_primary_seconds)
+            return response
         except AuthorizationError as e:
             return _access_denied(ctx, field_name=e.name)
+        except RequestBodyError as e:
+            return _unreadable_body(ctx, request, e)
         except Exception:
             import traceback
             logger.exception('Caught Exception in API')
             return _internal_error(ctx, request, traceback.format_exc())
 
+    if query_monitor is not None:
+        view = _monitor_queries(view, query_monitor)
+    if compression_threshold is not None:
+        view = _compress_responses(view, compression_threshold)
     return view
 
 
+def _monitor_queries(view, monitor):
+    @functools.wraps(view)
+    def inner(request, *args, **kwargs):
+        recorder = monitor.start()
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            monitor.stop(recorder)
+            raise
+        return monitor.finish(recorder, request, response)
+    return inner
+
+
+def _compress_responses(view, threshold):
+    # Hide this import from sphinx, it needs settings
+    from django.utils.cache import patch_vary_headers
+
+    @functools.wraps(view)
+    def inner(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code not in (200, 201) or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not _accepts_gzip(request):
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content)
+        else:
+            if len(response.content) < threshold:
+                return response
+            content = compress_string(response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = 'gzip'
+        return response
+    return inner
+
+
+def _accepts_gzip(request):
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        parts = coding.split(';')
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[parts[0].strip().lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
 def _strip_query_string(path):
     return path.split('?', 1)[0]
 
@@ -269,6 +825,30 @@ def _database_transaction_batch(func):
     return outer
 
 
+class _BatchRollback(Exception):
+    def __init__(self, result):
+        super(_BatchRollback, self).__init__()
+        self.result = result
+
+
+def _savepoint_batch(func):
+    """
+    Runs a write sub-request of a batch running in one transaction inside a
+    savepoint, rolled back unless the sub-request succeeds.
+    """
+    @functools.wraps(func)
+    def inner(ctx, resource, request):
+        try:
+            with transaction.atomic():
+                response = func(ctx, resource, request)
+                if not 200 <= response.get('status', 500) < 300:
+                    raise _BatchRollback(response)
+        except _BatchRollback, e:
+            return e.result
+        return response
+    return inner
+
+
 def _database_transaction(func):
     @functools.wraps(func)
     @transaction.commit_manually
@@ -285,13 +865,41 @@ def _database_transaction(func):
         return response
 
     def outer(ctx, resource, request):
-        try:
-            return inner(ctx, resource, request)
-        except transaction.TransactionManagementError:
-            return _transaction_conflict_to_response(ctx, resource, request)
+        retry_policy = getattr(ctx, 'retry_policy', None)
+        attempt = 1
+        while True:
+            try:
+                return inner(ctx, resource, request)
+            except Exception, e:
+                if retry_policy is None or not retry_policy.should_retry(e, attempt):
+                    if isinstance(e, transaction.TransactionManagementError):
+                        return _transaction_conflict_to_response(ctx, resource, request)
+                    raise
+            attempt += 1
+            # The failed attempt may have left objects on the stack and changes on its models
+            del ctx.object_stack[:]
+            if resource.resource_path is not None:
+                resource = ctx.resolve_resource_path(resource.resource_path) or resource
     return outer
 
 
+def _read_body(ctx, request):
+    """
+    Parses the request body.  When writes may be retried, a retry gets a copy
+    of what the first attempt parsed rather than reading the body again.
+    """
+    if getattr(ctx, 'retry_policy', None) is None:
+        return ctx.formatter.read_from(request)
+
+    body = request.__dict__.get('_savory_pie_body', _UNREAD)
+    if body is _UNREAD:
+        body = request._savory_pie_body = ctx.formatter.read_from(request)
+    return copy.deepcopy(body)
+
+
+_UNREAD = object()
+
+
 def _inner_transaction(ctx, resource, request, func):
     try:
         response = func(ctx, resource, request)
@@ -305,27 +913,120 @@ def _inner_transaction(ctx, resource, request, func):
     return response
 
 
-def _process_get(ctx, resource, request):
+def _process_get(ctx, resource, request, response_cache=None):
+    etag, last_modified = None, None
+    if 'GET' in resource.allowed_methods:
+        # Answer conditional GETs from the resource's cheap validators, before rendering
+        etag, last_modified = get_cache_validators(ctx, resource, _ParamsImpl(request.GET))
+        if _is_not_modified(request, etag, last_modified):
+            return _not_modified(ctx, resource, request, etag, last_modified)
+
+    if response_cache is not None:
+        cache_key = response_cache.get_key(ctx, resource, request.GET)
+        entry = response_cache.get(cache_key)
+        if entry is not None:
+            response = _cached_response(entry)
+            if _is_not_modified(request, response.get('ETag'), None):
+                return _not_modified(ctx, resource, request, response.get('ETag'), last_modified)
+            return response
     try:
         content_dict = process_get_request(
             ctx,
             resource,
             request.GET
         )
-        return _content_success(ctx, resource, request, content_dict)
+        response = _content_success(ctx, resource, request, content_dict)
     except MethodNotAllowedError:
         return _not_allowed_method(ctx, resource, request)
 
+    content_etag = response.get('ETag')
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+
+    # Not from a replica: once a write invalidated the cache, a lagging one
+    # would store the data from before it in the new generation
+    if response_cache is not None and not ctx.streaming_response and ctx.read_database is None:
+        response_cache.set(cache_key, resource, (response.status_code, response.content, response.items()))
+
+    if _is_not_modified(request, content_etag, None):
+        # Rendering was not avoided, but sending the body still can be; the 304
+        # hands out the cheap ETag, if any, so the next request avoids it
+        return _not_modified(ctx, resource, request, response.get('ETag'), last_modified)
+    return response
+
+
+def _is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        if etag is None:
+            return False
+        etags = [_strip_etag(value) for value in if_none_match.split(',')]
+        return '*' in etags or etag in etags
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since is not None and last_modified is not None:
+        since = parse_http_date_safe(if_modified_since)
+        return since is not None and _timestamp(last_modified) <= since
+
+    return False
+
+
+def _prefers_representation(request):
+    prefer = request.META.get('HTTP_PREFER', '')
+    return any(
+        preference.split(';')[0].replace(' ', '') == 'return=representation'
+        for preference in prefer.split(',')
+    )
+
+
+def _representation(ctx, resource, request, content_dict, status):
+    response = _content_success(ctx, resource, request, content_dict)
+    response.status_code = status
+    etag = get_cache_validators(ctx, resource, EmptyParams())[0]
+    if etag is not None:
+        response['ETag'] = etag
+    response['Preference-Applied'] = 'return=representation'
+    return response
+
+
+def _strip_etag(value):
+    value = value.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    return value.strip('"')
+
+
+def _timestamp(value):
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_default_timezone())
+    return calendar.timegm(value.utctimetuple())
+
+
+def _cached_response(entry):
+    status, content, headers = entry
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response[header] = value
+    return response
+
 
 @_database_transaction
 def _process_post(ctx, resource, request):
     try:
-        data = ctx.formatter.read_from(request)
+        data = _read_body(ctx, request)
         new_resource = process_post_request(
             ctx,
             resource,
             data
         )
+        if _prefers_representation(request) and 'GET' in new_resource.allowed_methods:
+            # Rendered from the model graph just saved, sparing the client a GET
+            response = _representation(ctx, new_resource, request, new_resource.get(ctx, EmptyParams()), 201)
+            response['Location'] = ctx.build_resource_uri(new_resource)
+            return response
         return _created(ctx, request, request, new_resource)
     except validators.ValidationError, ve:
         return _validation_errors(ctx, ve.resource, request, ve.errors)
@@ -336,13 +1037,17 @@ def _process_post(ctx, resource, request):
 @_database_transaction
 def _process_put(ctx, resource, request):
     try:
-        data = ctx.formatter.read_from(request)
+        data = _read_body(ctx, request)
         content_dict = process_put_request(
             ctx,
             resource,
             data,
             expected_hash=request.META.get('HTTP_IF_MATCH')
         )
+        if _prefers_representation(request) and 'GET' in resource.allowed_methods:
+            if not content_dict:
+                content_dict = resource.get(ctx, EmptyParams())
+            return _representation(ctx, resource, request, content_dict, 200)
         if content_dict:
             return _content_success(ctx, resource, request, content_dict)
         return _no_content_success(ctx, resource, request)
@@ -358,10 +1063,14 @@ def _process_put(ctx, resource, request):
 
 def _process_delete(ctx, resource, request):
     try:
-        process_delete_request(ctx, resource)
+        content_dict = process_delete_request(ctx, resource)
+        if content_dict:
+            return _content_success(ctx, resource, request, content_dict)
         return _success(ctx, request, request)
     except MethodNotAllowedError:
         return _not_allowed_method(ctx, resource, request)
+    except validators.ValidationError, ve:
+        return _validation_errors(ctx, resource, request, ve.errors)
 
 
 def _not_found(ctx, request):
@@ -377,6 +1086,15 @@ def _access_denied(ctx, field_name=''):
     return response
 
 
+def _not_modified(ctx, resource, request, etag, last_modified):
+    response = HttpResponse(status=304)
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    return response
+
+
 def _precondition_failed(ctx, resource, request):
     return HttpResponse(status=412)
 
@@ -403,6 +1121,12 @@ def _created(ctx, resource, request, new_resource):
     return response
 
 
+def _formatted(ctx, content_dict):
+    output = StringIO()
+    ctx.formatter.write_to(content_dict, output)
+    return output.getvalue()
+
+
 def _content_success(ctx, resource, request, content_dict):
     if ctx.streaming_response:
         response = StreamingHttpResponse(
@@ -433,6 +1157,13 @@ def _success(ctx, resource, request, content_dict=None):
     return HttpResponse(status=200)
 
 
+def _unreadable_body(ctx, request, error):
+    response = HttpResponse(status=error.status, content_type=ctx.formatter.content_type)
+    error_body = {ctx.formatter.convert_to_public_property('error'): error.message}
+    ctx.formatter.write_to(error_body, response)
+    return response
+
+
 def _internal_error(ctx, request, error):
     response = HttpResponse(status=500, content_type=ctx.formatter.content_type)
     error_body = {ctx.formatter.convert_to_public_property('error'): error}
@@ -28,3 +28,15 @@ class SavoryPieError(Exception):
     General Savory Pie Error
     """
     pass
+
+
+class RequestBodyError(Exception):
+    """
+    The request body could not be read, either because it is malformed or
+    because it exceeds the formatter's limits.
+    """
+    status = 400
+
+
+class RequestBodyTooLargeError(RequestBodyError):
+    status = 413
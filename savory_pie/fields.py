@@ -3,7 +3,7 @@ import functools
 import importlib
 from savory_pie.auth import authorization, authorization_adapter
 from savory_pie.resources import EmptyParams
-from savory_pie.django.validators import validate, ValidationError
+from savory_pie.django.validators import validate, validate_all, ValidationError
 from savory_pie.errors import SavoryPieError
 
 
@@ -687,10 +687,21 @@ class IterableField(Field):
 
         # Delay all the new creates untill after the deletes for unique
         # constraints again
-        for model_dict in new_put_data:
-            model_resource = self._resource_class.create_resource()
+        new_resources = [self._resource_class.create_resource() for model_dict in new_put_data]
+
+        # Validate the new instances together rather than one at a time in put,
+        # so database-backed validators can share their queries.
+        with ctx.target(target_obj):
+            errors = validate_all(ctx, [
+                (type(model_resource).__name__, model_resource, model_dict)
+                for model_resource, model_dict in zip(new_resources, new_put_data)
+            ])
+        if errors:
+            raise ValidationError(self, errors)
+
+        for model_resource, model_dict in zip(new_resources, new_put_data):
             with ctx.target(target_obj):
-                model_resource.put(ctx, model_dict, save=True)
+                model_resource.put(ctx, model_dict, save=True, skip_validation=True)
             new_models.append(model_resource.model)
 
         if hasattr(attribute, 'add'):
@@ -1,3 +1,4 @@
+import collections
 import exceptions
 import json
 import pytz
@@ -6,15 +7,37 @@ import re
 
 from dateutil import parser
 
+from savory_pie.errors import RequestBodyError, RequestBodyTooLargeError
+
 
 class JSONFormatter(object):
     """
     Formatter reads and writes json while converting properties to and from
     javascript naming conventions and pep8.
+
+    Request bodies are read incrementally when any of these limits is set,
+    failing with a RequestBodyError as soon as one is exceeded:
+
+        ``max_body_size``
+            maximum number of bytes in a request body
+
+        ``max_depth``
+            maximum nesting of objects and arrays
+
+        ``max_list_length``
+            maximum number of items in any array
     """
 
     content_type = 'application/json'
 
+    #: bytes read at a time when reading incrementally
+    chunk_size = 64 * 1024
+
+    def __init__(self, max_body_size=None, max_depth=None, max_list_length=None):
+        self.max_body_size = max_body_size
+        self.max_depth = max_depth
+        self.max_list_length = max_list_length
+
     dateRegex = re.compile('(\d{4})-(\d{2})-(\d{2})(.*)')
 
     def parse_datetime(self, s):
@@ -34,12 +57,45 @@ class JSONFormatter(object):
             return parser.parse(s).date()
         raise TypeError('Unable to parse ' + repr(s) + ' as a datetime')
 
+    # Property names come from resource definitions, so there are few of them
+    _public_properties = {}
+
     def convert_to_public_property(self, bare_attribute):
-        parts = bare_attribute.split('_')
-        return ''.join([parts[0], ''.join(x.capitalize() for x in parts[1:])])
+        try:
+            return self._public_properties[bare_attribute]
+        except KeyError:
+            parts = bare_attribute.split('_')
+            public_property = ''.join([parts[0], ''.join(x.capitalize() for x in parts[1:])])
+            self._public_properties[bare_attribute] = public_property
+            return public_property
+
+    @property
+    def is_limited(self):
+        """
+        Whether any limit is set, in which case bodies are read incrementally.
+        """
+        return self.max_body_size is not None or self.max_depth is not None or self.max_list_length is not None
 
     def read_from(self, request):
-        return json.load(request)
+        if not self.is_limited:
+            return json.load(request)
+
+        reader = _JSONReader(self, request, keep=True)
+        for item in reader.scan():
+            pass
+        try:
+            return json.loads(reader.body())
+        except ValueError, e:
+            raise RequestBodyError('Malformed JSON: {0}'.format(e))
+
+    def iter_items(self, request, key=None):
+        """
+        Reads the request body incrementally, yielding the items of its top
+        level array - or, given a key, of the array under key in its top level
+        object - one at a time as soon as each is complete.  Bodies without
+        such an array yield nothing.
+        """
+        return _JSONReader(self, request, keep=False).scan(key, items=True)
 
     def write_to(self, body_dict, response):
         json.dump(body_dict, response)
@@ -70,3 +126,167 @@ class JSONFormatter(object):
                 return str(python_value)
 
         return python_value
+
+
+# A whole string, or else a structural character - a lone quote opening a string
+# that continues in the next chunk
+_STRUCTURAL = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},"]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class _JSONReader(object):
+    """
+    Scans a JSON document as it is read from a file-like object, tracking just
+    enough state (strings and the open arrays and objects) to enforce the
+    formatter's limits and find item boundaries without decoding anything.
+
+    Every chunk is scanned on its own, positions being offsets within the whole
+    body.  The chunks still needed are kept as they were read and only joined
+    to decode an item spanning several of them.  Unless keep is True, chunks
+    before the current item are dropped once scanned.
+    """
+    def __init__(self, formatter, stream, keep):
+        self.formatter = formatter
+        self.stream = stream
+        self.keep = keep
+        self.chunks = collections.deque()
+        # offset of the first chunk kept, and the size of the body read
+        self.chunks_start = 0
+        self.size = 0
+        # one entry per open container: the number of commas for an array, None for an object
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+
+    def read_chunk(self):
+        if self.formatter.max_body_size is not None and self.size == 0:
+            content_length = getattr(self.stream, 'META', {}).get('CONTENT_LENGTH')
+            try:
+                content_length = int(content_length or 0)
+            except ValueError:
+                raise RequestBodyError('Malformed Content-Length: {0}'.format(content_length))
+            if content_length > self.formatter.max_body_size:
+                raise RequestBodyTooLargeError('Request body exceeds {0} bytes'.format(self.formatter.max_body_size))
+
+        chunk = self.stream.read(self.formatter.chunk_size)
+        self.size += len(chunk)
+        if self.formatter.max_body_size is not None and self.size > self.formatter.max_body_size:
+            raise RequestBodyTooLargeError('Request body exceeds {0} bytes'.format(self.formatter.max_body_size))
+        return chunk
+
+    def body(self):
+        return ''.join(self.chunks)
+
+    def text(self, start, end):
+        """
+        Returns the body between the offsets start and end, within the chunks kept.
+        """
+        chunk = self.chunks[-1]
+        chunk_start = self.size - len(chunk)
+        if start >= chunk_start:
+            return chunk[start - chunk_start:end - chunk_start]
+        return self.body()[start - self.chunks_start:end - self.chunks_start]
+
+    def scan(self, key=None, items=False):
+        target_depth = None
+        target_done = not items
+        item_start = None
+
+        while True:
+            chunk = self.read_chunk()
+            if not chunk:
+                break
+            self.chunks.append(chunk)
+            chunk_start = self.size - len(chunk)
+            position = 0
+
+            while position < len(chunk):
+                if self.escape:
+                    self.escape = False
+                    position += 1
+                    continue
+
+                if self.in_string:
+                    match = _STRING_SPECIAL.search(chunk, position)
+                    if match is None:
+                        break
+                    position = match.end()
+                    if match.group() == '\\':
+                        self.escape = True
+                    else:
+                        self.in_string = False
+                        if len(self.stack) == 1 and self.stack[0] is None:
+                            self.last_string = self.text(self.string_start, chunk_start + position)
+                    continue
+
+                match = _STRUCTURAL.search(chunk, position)
+                if match is None:
+                    break
+                char = match.group()
+                position = match.end()
+
+                if char[0] == '"':
+                    if len(char) > 1:
+                        if len(self.stack) == 1 and self.stack[0] is None:
+                            self.last_string = char
+                    else:
+                        self.in_string = True
+                        self.string_start = chunk_start + match.start()
+                elif char in '[{':
+                    self.stack.append(0 if char == '[' else None)
+                    if self.formatter.max_depth is not None and len(self.stack) > self.formatter.max_depth:
+                        raise RequestBodyError('Request body nested deeper than {0}'.format(self.formatter.max_depth))
+                    if not target_done and char == '[' and self._is_target(key):
+                        target_depth = len(self.stack)
+                        item_start = chunk_start + position
+                elif char == ',':
+                    if self.stack and self.stack[-1] is not None:
+                        self.stack[-1] += 1
+                        if self.formatter.max_list_length is not None and \
+                                self.stack[-1] >= self.formatter.max_list_length:
+                            raise RequestBodyError(
+                                'Request body has a list longer than {0}'.format(self.formatter.max_list_length)
+                            )
+                    if target_depth == len(self.stack):
+                        yield self._decode(self.text(item_start, chunk_start + match.start()))
+                        item_start = chunk_start + position
+                else:
+                    if not self.stack:
+                        raise RequestBodyError('Malformed JSON: unbalanced {0}'.format(char))
+                    if target_depth == len(self.stack):
+                        item = self.text(item_start, chunk_start + match.start())
+                        if item.strip():
+                            yield self._decode(item)
+                        elif self.stack[-1]:
+                            raise RequestBodyError('Malformed JSON: trailing comma')
+                        target_depth = None
+                        target_done = True
+                    self.stack.pop()
+
+            if not self.keep:
+                # Only the current item, or an unfinished top level key, is still needed
+                keep_from = self.size
+                if target_depth is not None:
+                    keep_from = item_start
+                elif self.in_string and len(self.stack) == 1:
+                    keep_from = self.string_start
+                while self.chunks and self.chunks_start + len(self.chunks[0]) <= keep_from:
+                    self.chunks_start += len(self.chunks.popleft())
+
+        if self.stack or self.in_string:
+            raise RequestBodyError('Malformed JSON: truncated request body')
+
+    def _is_target(self, key):
+        if key is None:
+            return len(self.stack) == 1
+        if len(self.stack) != 2 or self.stack[0] is not None or self.last_string is None:
+            return False
+        return self._decode(self.last_string) == key
+
+    def _decode(self, text):
+        try:
+            return json.loads(text)
+        except ValueError, e:
+            raise RequestBodyError('Malformed JSON: {0}'.format(e))
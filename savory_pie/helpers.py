@@ -24,6 +24,18 @@ def get_sha1(ctx, dct):
     return _hash_string(buf.getvalue())
 
 
+def get_cache_validators(ctx, resource, params):
+    """
+    Returns the (etag, last_modified) the resource can provide without rendering
+    itself, either of which may be None.
+    """
+    try:
+        get_cache_validators = resource.get_cache_validators
+    except AttributeError:
+        return None, None
+    return get_cache_validators(ctx, params) or (None, None)
+
+
 def process_get_request(ctx, resource, get_params):
     if 'GET' in resource.allowed_methods:
         return resource.get(ctx, _ParamsImpl(get_params))
@@ -40,10 +52,18 @@ def process_post_request(ctx, resource, data):
 
 def process_put_request(ctx, resource, data, expected_hash=None):
     if 'PUT' in resource.allowed_methods:
+        if not getattr(resource, 'supports_if_match', True):
+            # The precondition cannot be checked, so it cannot hold
+            if expected_hash:
+                raise PreConditionError()
+            return resource.put(ctx, data)
+
         previous_content_dict = resource.get(ctx, EmptyParams())
+        # A cheap ETag handed out by a conditional GET is as good as the hash
+        previous_etag = get_cache_validators(ctx, resource, EmptyParams())[0] if expected_hash else None
         content_dict = resource.put(ctx, data,)
         # validation errors take precedence over hash mismatch
-        if expected_hash and expected_hash != get_sha1(ctx, previous_content_dict):
+        if expected_hash and expected_hash not in (get_sha1(ctx, previous_content_dict), previous_etag):
             raise PreConditionError()
         else:
             return content_dict
@@ -53,7 +73,7 @@ def process_put_request(ctx, resource, data, expected_hash=None):
 
 def process_delete_request(ctx, resource):
     if 'DELETE' in resource.allowed_methods:
-        resource.delete(ctx)
+        return resource.delete(ctx)
     else:
         raise MethodNotAllowedError(method='DELETE')
 
@@ -14,6 +14,12 @@ try:
             return func(request, resource_path)
         return inner
 
+    def record_metric(name, value):
+        agent.record_custom_metric(name, value)
+
 except ImportError:
     def set_transaction_name(func):
         return func
+
+    def record_metric(name, value):
+        pass
@@ -22,6 +22,25 @@ class EmptyParams(object):
         return []
 
 
+_OBJ_METHODS = (('GET', 'get'), ('POST', 'post'), ('PUT', 'put'), ('DELETE', 'delete'))
+
+# Methods provided by each Resource class, see Resource.allowed_methods
+_allowed_methods = {}
+
+
+def _probe_allowed_methods(obj):
+    allowed_methods = []
+
+    for http_method, obj_method in _OBJ_METHODS:
+        try:
+            getattr(obj, obj_method)
+            allowed_methods.append(http_method)
+        except AttributeError:
+            pass
+
+    return allowed_methods
+
+
 class Resource(object):
     """
     Base object for defining resources.
@@ -34,6 +53,10 @@ class Resource(object):
 
     validators = []
 
+    #: Whether a PUT can be checked against an If-Match hash of the resource's
+    #: current representation; if not, PUTs with an If-Match are refused.
+    supports_if_match = True
+
     @property
     def allowed_methods(self):
         """
@@ -43,17 +66,19 @@ class Resource(object):
         Can be overridden with a static set or dynamic property to
         create access controls.
         """
-        allowed_methods = set()
-
-        for http_method in ['GET', 'POST', 'PUT', 'DELETE']:
-            obj_method = http_method.lower()
-            try:
-                getattr(self, obj_method)
-                allowed_methods.add(http_method)
-            except AttributeError:
-                pass
-
-        return allowed_methods
+        resource_class = type(self)
+        instance_dict = getattr(self, '__dict__', {})
+        if hasattr(resource_class, '__getattr__') or \
+                any(obj_method in instance_dict for http_method, obj_method in _OBJ_METHODS):
+            # Methods may vary per instance, probe this one
+            return set(_probe_allowed_methods(self))
+
+        try:
+            allowed_methods = _allowed_methods[resource_class]
+        except KeyError:
+            allowed_methods = _allowed_methods[resource_class] = tuple(_probe_allowed_methods(resource_class))
+        # Callers are free to modify the set they are handed
+        return set(allowed_methods)
 
     # def get(self, ctx, params):
         """
@@ -65,6 +90,16 @@ class Resource(object):
         Returns a dict of data to be serialized to the requested format.
         """
 
+    # def get_cache_validators(self, ctx, params):
+        """
+        Optional method that is called before a GET request is served.
+
+        Returns an (etag, last_modified) tuple, either of which may be None, or
+        None altogether.  The validators must be cheap to compute - without
+        rendering the resource - so conditional GETs can be answered with a 304
+        before any serialization.
+        """
+
     # def post(self, ctx, dict):
         """
         Optional method that is called during a POST request.
@@ -105,6 +140,13 @@ class APIResource(Resource):
     def base_regex(self):
         return self._base_regex
 
+    @property
+    def child_resources(self):
+        """
+        The resources registered into the API.
+        """
+        return self._child_resources.values()
+
     def register(self, resource):
         """
         Register a resource into the API.
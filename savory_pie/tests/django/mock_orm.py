@@ -19,6 +19,8 @@ class QuerySet(Mock):
         self._elements = elements
         self._selected = set()
         self._prefetched = set()
+        self.query = Mock(name='query')
+        self.query.can_filter.return_value = True
 
     def __iter__(self):
         return self.iterator()
@@ -26,6 +28,14 @@ class QuerySet(Mock):
     def iterator(self):
         return iter(self._elements)
 
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            queryset = QuerySet(*self._elements[key])
+            # Like Django, a slice cannot be filtered any further
+            queryset.query.can_filter.return_value = False
+            return queryset
+        return self._elements[key]
+
     def __list__(self):
         raise UserWarning(u'Don\'t call list; it will not take advantage of prior prefetch optimizations')
 
@@ -54,9 +64,13 @@ class QuerySet(Mock):
             q = args[0]
         else:
             q = Q(*args, **kwargs)
-        queryset = QuerySet(*self._filter_q(q))
+        matches = self._filter_q(q)
+        # Like Django, filtering keeps the ordering
+        queryset = QuerySet(*[element for element in self._elements if element in matches])
         queryset._selected = set(queryset._selected)
         queryset._prefetched = set(queryset._prefetched)
+        # Only filtering without criteria is allowed on a slice, and keeps it one
+        queryset.query.can_filter.return_value = self.query.can_filter.return_value
         return queryset
 
     def order_by(self, *attributes):
@@ -78,6 +92,11 @@ class QuerySet(Mock):
         elements.sort(compare)
         return QuerySet(*elements)
 
+    def values_list(self, *fields, **kwargs):
+        if kwargs.get('flat'):
+            return [getattr(element, fields[0]) for element in self._elements]
+        return [tuple(getattr(element, field) for field in fields) for element in self._elements]
+
     def get(self, **kwargs):
         filtered_elements = list(self._filter_elements(**kwargs))
         count = len(filtered_elements)
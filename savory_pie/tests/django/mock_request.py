@@ -4,14 +4,26 @@ from savory_pie.django import views
 from savory_pie.tests.mock_context import mock_context as _mock_context
 
 
-def savory_dispatch(root_resource, method, resource_path='', body=None, GET=None, POST=None):
-    view = views.api_view(root_resource)
+def savory_dispatch(root_resource, method, resource_path='', body=None, GET=None, POST=None, META=None,
+                    response_cache=None, formatter=None, compression_threshold=None, read_database=None,
+                    COOKIES=None, retry_policy=None, query_monitor=None):
+    view = views.api_view(
+        root_resource,
+        response_cache=response_cache,
+        formatter=formatter,
+        compression_threshold=compression_threshold,
+        read_database=read_database,
+        retry_policy=retry_policy,
+        query_monitor=query_monitor
+    )
     request = Request(
         method=method,
         resource_path=resource_path,
         body=body,
         GET=GET,
-        POST=POST
+        POST=POST,
+        META=META,
+        COOKIES=COOKIES
     )
 
     return view(request=request, resource_path=resource_path)
@@ -24,9 +36,22 @@ def savory_dispatch_batch(
         body=None,
         GET=None,
         POST=None,
-        base_regex=None
+        base_regex=None,
+        max_workers=None,
+        transaction_mode=None,
+        streaming=False,
+        query_monitor=None,
+        formatter=None
 ):
-    view = views.batch_api_view(root_resource, base_regex)
+    view = views.batch_api_view(
+        root_resource,
+        base_regex,
+        max_workers=max_workers,
+        transaction_mode=transaction_mode,
+        streaming=streaming,
+        query_monitor=query_monitor,
+        formatter=formatter
+    )
     request = Request(
         method=method,
         host=full_host,
@@ -47,7 +72,8 @@ class User(object):
 
 
 class Request(object):
-    def __init__(self, method, host='localhost', resource_path='', body=None, GET=None, POST=None):
+    def __init__(self, method, host='localhost', resource_path='', body=None, GET=None, POST=None, META=None,
+                 COOKIES=None):
         self.host = host
         self.resource_path = resource_path
 
@@ -59,7 +85,8 @@ class Request(object):
 
         self.GET = GET or {}
         self.POST = POST or {}
-        self.META = {}
+        self.META = META or {}
+        self.COOKIES = COOKIES or {}
         self.REQUEST = dict(self.GET, **self.POST)
 
     def get_host(self):
@@ -71,11 +98,11 @@ class Request(object):
     def build_absolute_uri(self, django_path):
         return 'http://' + self.host + '/' + django_path
 
-    def read(self):
+    def read(self, size=-1):
         if not self.body_file:
             self.body_file = StringIO(self.body)
 
-        return self.body_file.read()
+        return self.body_file.read(size)
 
 
 def mock_context(*args, **kwargs):
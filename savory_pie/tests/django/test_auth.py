@@ -1,6 +1,8 @@
 import unittest
 from mock import Mock
+from savory_pie.auth import authorization
 from savory_pie.django.auth import DjangoUserPermissionValidator
+from savory_pie.errors import AuthorizationError
 
 
 class DjangoUserPermissionValidatorTestCase(unittest.TestCase):
@@ -20,3 +22,46 @@ class DjangoUserPermissionValidatorTestCase(unittest.TestCase):
         # Should not call has_perm
         ctx.request.user.has_perm.side_effect = Exception
         self.assertTrue(validator.is_write_authorized(ctx, None, 'a', 'a'))
+
+    def test_permission_resolved_once_per_request(self):
+        validator = DjangoUserPermissionValidator('value')
+        other_validator = DjangoUserPermissionValidator('value')
+        ctx = Mock(spec=['user'])
+        ctx.request = Mock()
+        ctx.request.user.has_perm.return_value = True
+        self.assertTrue(validator.is_write_authorized(ctx, None, 'a', 'b'))
+        self.assertTrue(other_validator.is_write_authorized(ctx, None, 'c', 'd'))
+        self.assertTrue(validator.has_permission(ctx))
+        self.assertEqual(ctx.request.user.has_perm.call_count, 1)
+
+    def test_overridden_write_check_not_bypassed(self):
+        class OwnerPermissionValidator(DjangoUserPermissionValidator):
+            def is_write_authorized(self, ctx, target_obj, source, target):
+                return target_obj.owner == ctx.request.user
+
+        adapter = Mock(return_value=('field', 'a', 'b'))
+        function = Mock()
+        field = Mock(spec=['permission'])
+        field.permission = OwnerPermissionValidator('value')
+        ctx = Mock(spec=['request', 'permission_cache'])
+        ctx.permission_cache = {}
+        ctx.request = Mock()
+        ctx.request.user.has_perm.return_value = True
+
+        with self.assertRaises(AuthorizationError):
+            authorization(adapter)(function)(field, ctx, {}, Mock(owner='someone else'))
+        self.assertTrue(adapter.called)
+        self.assertFalse(function.called)
+
+    def test_granted_permission_skips_adapter(self):
+        adapter = Mock(side_effect=AssertionError('should not be called'))
+        function = Mock()
+        field = Mock(spec=['permission'])
+        field.permission = DjangoUserPermissionValidator('value')
+        ctx = Mock(spec=['request', 'permission_cache'])
+        ctx.permission_cache = {}
+        ctx.request = Mock()
+        ctx.request.user.has_perm.return_value = True
+
+        authorization(adapter)(function)(field, ctx, {}, None)
+        self.assertTrue(function.called)
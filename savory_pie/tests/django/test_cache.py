@@ -0,0 +1,124 @@
+import unittest
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import post_save
+from mock import Mock
+
+from savory_pie.django.cache import LRUCache, ResponseCache
+from savory_pie.tests.django.mock_request import savory_dispatch
+from savory_pie.tests.django.test_views import mock_resource
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'C')
+
+    def test_evicts_by_size(self):
+        cache = LRUCache(max_size=5)
+        cache.set('a', 'aaa')
+        cache.set('b', 'bbb')
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'bbb')
+        self.assertEqual(cache.size, 3)
+
+    def test_oversized_value_not_cached(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 'aaa')
+        self.assertEqual(len(cache), 0)
+
+
+class Car(object):
+    pass
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def create_resource(self):
+        resource = mock_resource(name='root')
+        resource.allowed_methods.update(['GET', 'PUT'])
+        resource.get = Mock(return_value={'foo': 'bar'})
+        resource.put = Mock(return_value=None)
+        return resource
+
+    def test_get_served_from_cache(self):
+        resource = self.create_resource()
+        cache = ResponseCache()
+
+        first = savory_dispatch(resource, method='GET', response_cache=cache)
+        second = savory_dispatch(resource, method='GET', response_cache=cache)
+
+        self.assertEqual(resource.get.call_count, 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_query_params_part_of_key(self):
+        resource = self.create_resource()
+        cache = ResponseCache()
+
+        savory_dispatch(resource, method='GET', GET={'a': '1', 'b': '2'}, response_cache=cache)
+        savory_dispatch(resource, method='GET', GET={'b': '2', 'a': '1'}, response_cache=cache)
+        self.assertEqual(resource.get.call_count, 1)
+
+        savory_dispatch(resource, method='GET', GET={'a': '2'}, response_cache=cache)
+        self.assertEqual(resource.get.call_count, 2)
+
+    def test_write_invalidates(self):
+        resource = self.create_resource()
+        cache = ResponseCache()
+
+        savory_dispatch(resource, method='GET', response_cache=cache)
+        savory_dispatch(resource, method='PUT', body='{}', response_cache=cache)
+        savory_dispatch(resource, method='GET', response_cache=cache)
+
+        self.assertEqual(resource.get.call_count, 3)
+
+    def test_model_signal_invalidates(self):
+        resource = self.create_resource()
+        resource.model_class = Car
+        cache = ResponseCache()
+
+        savory_dispatch(resource, method='GET', response_cache=cache)
+        savory_dispatch(resource, method='GET', response_cache=cache)
+        self.assertEqual(resource.get.call_count, 1)
+
+        post_save.send(sender=Car, instance=Car(), created=False)
+        savory_dispatch(resource, method='GET', response_cache=cache)
+        self.assertEqual(resource.get.call_count, 2)
+
+    def test_shared_backend(self):
+        backend = LocMemCache('savory_pie_test', {})
+        resource = self.create_resource()
+
+        savory_dispatch(resource, method='GET', response_cache=ResponseCache(backend=backend))
+        savory_dispatch(resource, method='GET', response_cache=ResponseCache(backend=backend))
+        self.assertEqual(resource.get.call_count, 1)
+
+        ResponseCache(backend=backend).invalidate(resource)
+        savory_dispatch(resource, method='GET', response_cache=ResponseCache(backend=backend))
+        self.assertEqual(resource.get.call_count, 2)
+
+    def test_shared_generation_evicted(self):
+        backend = LocMemCache('savory_pie_test_evicted', {})
+        cache = ResponseCache(backend=backend)
+        seen = set()
+        for _ in range(3):
+            generation = cache._generation('tag')
+            self.assertNotIn(generation, seen)
+            seen.add(generation)
+            self.assertEqual(cache._generation('tag'), generation)
+            cache.invalidate_tag('tag')
+            self.assertNotIn(cache._generation('tag'), seen)
+            # The backend evicts the generation, which must not come back
+            backend.delete(cache._generation_key('tag'))
@@ -0,0 +1,97 @@
+import unittest
+
+from django.db.models.fields import FieldDoesNotExist
+from mock import Mock, patch
+
+from savory_pie.django import fields, resources
+from savory_pie.django.compiler import compile_api
+from savory_pie.errors import SavoryPieError
+from savory_pie.resources import APIResource
+from savory_pie.tests.django import mock_orm
+
+
+class Author(mock_orm.Model):
+    name = Mock()
+
+
+class Book(mock_orm.Model):
+    title = Mock()
+    author = Mock()
+
+
+class AuthorResource(resources.ModelResource):
+    model_class = Author
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+    ]
+
+
+class BookResource(resources.ModelResource):
+    parent_resource_path = 'books'
+    model_class = Book
+    fields = [
+        fields.AttributeField(attribute='title', type=str),
+        fields.SubModelResourceField(
+            attribute='author',
+            resource_class='savory_pie.tests.django.test_compiler.AuthorResource'
+        ),
+    ]
+
+
+class BookQuerySetResource(resources.QuerySetResource):
+    resource_class = BookResource
+
+
+def make_api(resource_class):
+    queryset_resource_class = type('CompiledQuerySetResource', (resources.QuerySetResource,), {
+        'resource_class': resource_class
+    })
+    root = APIResource()
+    root.register(queryset_resource_class(mock_orm.QuerySet()))
+    return root
+
+
+class CompileApiTest(unittest.TestCase):
+
+    def test_resolves_resource_classes(self):
+        resource_classes = compile_api(make_api(BookResource))
+        self.assertEqual(resource_classes, {BookResource, AuthorResource})
+
+    def test_precomputes_prepare_plan(self):
+        root = make_api(BookResource)
+        compile_api(root)
+        queryset_resource = root.child_resources[0]
+
+        with patch.object(BookResource, 'prepare') as prepare:
+            queryset_resource.prepare_queryset(Mock(formatter=resources.JSONFormatter()), mock_orm.QuerySet())
+
+        self.assertFalse(prepare.called)
+
+    def test_unresolvable_resource_class(self):
+        class BrokenResource(resources.ModelResource):
+            parent_resource_path = 'broken'
+            model_class = Book
+            fields = [
+                fields.SubModelResourceField(
+                    attribute='author',
+                    resource_class='savory_pie.tests.django.test_compiler.MissingResource'
+                ),
+            ]
+
+        with self.assertRaises(SavoryPieError) as cm:
+            compile_api(make_api(BrokenResource))
+        self.assertIn('MissingResource', cm.exception.message)
+
+    def test_unknown_attribute(self):
+        class MisspelledResource(resources.ModelResource):
+            parent_resource_path = 'misspelled'
+            model_class = Book
+            fields = [
+                fields.AttributeField(attribute='titel', type=str),
+            ]
+
+        with patch.object(Book, '_meta') as meta:
+            meta.get_field_by_name.side_effect = FieldDoesNotExist
+            with self.assertRaises(SavoryPieError) as cm:
+                compile_api(make_api(MisspelledResource))
+        self.assertIn('Book has no attribute titel', cm.exception.message)
@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from savory_pie.django.export import export_queryset_resource
+from savory_pie.django.filters import ParameterizedFilter
+from savory_pie.tests.django import mock_orm
+from savory_pie.tests.django.test_resources import AddressableUserQuerySetResource, User
+
+
+class ExportQuerySetResourceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.resource = AddressableUserQuerySetResource(mock_orm.QuerySet(*[
+            User(pk=pk, name='user{0}'.format(pk), age=pk)
+            for pk in [7, 2, 9, 4, 1, 8, 3]
+        ]))
+        self.resource.filters = [
+            ParameterizedFilter('max_age', 'age__lte'),
+            ParameterizedFilter('limit', 'limit_object_count'),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_lines(self, name):
+        with open(os.path.join(self.directory, name)) as export_file:
+            return [json.loads(line) for line in export_file]
+
+    def test_parts(self):
+        manifest = export_queryset_resource(
+            self.resource, self.directory, params={'maxAge': 8}, processes=1, shards=3, base_uri='http://host/'
+        )
+
+        self.assertEqual(manifest['count'], 6)
+        self.assertEqual(manifest['resourceUri'], 'http://host/users')
+        self.assertEqual(
+            [(part['file'], part['count']) for part in manifest['parts']],
+            [('part-00000.ndjson', 2), ('part-00001.ndjson', 2), ('part-00002.ndjson', 2)]
+        )
+        names = [
+            [obj['name'] for obj in self.read_lines(part['file'])]
+            for part in manifest['parts']
+        ]
+        self.assertEqual(names, [['user1', 'user2'], ['user3', 'user4'], ['user7', 'user8']])
+        self.assertEqual(self.read_lines('part-00000.ndjson')[0]['resourceUri'], 'http://host/users/1')
+
+        with open(os.path.join(self.directory, 'manifest.json')) as manifest_file:
+            self.assertEqual(json.load(manifest_file), manifest)
+
+    def test_merge(self):
+        manifest = export_queryset_resource(self.resource, self.directory, processes=1, shards=2, merge=True)
+
+        self.assertEqual(manifest['file'], 'export.ndjson')
+        self.assertNotIn('parts', manifest)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['export.ndjson', 'manifest.json'])
+        lines = self.read_lines('export.ndjson')
+        self.assertEqual([obj['age'] for obj in lines[:-1]], [1, 2, 3, 4, 7, 8, 9])
+        self.assertEqual(lines[-1], {'meta': {'count': 7, 'resourceUri': 'users'}})
+
+    def test_worker_processes(self):
+        manifest = export_queryset_resource(self.resource, self.directory, processes=2, shards=4)
+
+        self.assertEqual([part['count'] for part in manifest['parts']], [2, 2, 2, 1])
+        self.assertEqual(manifest['count'], 7)
+        self.assertEqual(len(self.read_lines('part-00003.ndjson')), 1)
+
+    def test_limited(self):
+        manifest = export_queryset_resource(self.resource, self.directory, params={'limit': 3}, processes=2, shards=3)
+
+        self.assertEqual([(part['file'], part['count']) for part in manifest['parts']], [('part-00000.ndjson', 3)])
+        self.assertEqual(len(self.read_lines('part-00000.ndjson')), 3)
@@ -0,0 +1,118 @@
+import json
+import unittest
+
+from django.contrib.auth.models import Group, User
+from django.core.management.color import no_style
+from django.db import connection
+
+from savory_pie.django import fields, resources
+from savory_pie.django.queries import QueryMonitor, normalize_sql
+from savory_pie.resources import APIResource
+from savory_pie.tests.django.mock_request import savory_dispatch, savory_dispatch_batch
+
+
+class GroupCountField(fields.AttributeField):
+    """
+    Counts the groups of every user with a query of its own.
+    """
+    def __init__(self):
+        super(GroupCountField, self).__init__('groups', type=int)
+
+    def handle_outgoing(self, ctx, source_obj, target_dict):
+        target_dict['groupCount'] = source_obj.groups.count()
+
+
+class UserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+    fields = [
+        fields.AttributeField('username', type=str),
+        GroupCountField(),
+    ]
+
+
+class UserQuerySetResource(resources.QuerySetResource):
+    resource_class = UserResource
+
+
+class RecordingQueryMonitor(QueryMonitor):
+    def report(self, request, report):
+        self.last_report = report
+        super(RecordingQueryMonitor, self).report(request, report)
+
+
+class NormalizeSqlTest(unittest.TestCase):
+
+    def test_literals_replaced(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t1 WHERE id = 12 AND name = 'it''s' AND pk IN (1, 2, 3)"),
+            'SELECT * FROM t1 WHERE id = ? AND name = ? AND pk IN (...)'
+        )
+
+
+class QueryMonitorTest(unittest.TestCase):
+    models = [User, Group, User.groups.through]
+
+    def setUp(self):
+        cursor = connection.cursor()
+        for model in self.models:
+            statements, pending = connection.creation.sql_create_model(model, no_style())
+            for statement in statements:
+                cursor.execute(statement)
+        for index in range(6):
+            User.objects.create(username='user{0}'.format(index))
+
+        self.root_resource = APIResource()
+        self.root_resource.register(UserQuerySetResource(User.objects.all()))
+
+    def tearDown(self):
+        cursor = connection.cursor()
+        for model in self.models:
+            cursor.execute('DROP TABLE {0}'.format(model._meta.db_table))
+
+    def test_repeated_queries_reported(self):
+        monitor = RecordingQueryMonitor(headers=True)
+
+        response = savory_dispatch(self.root_resource, method='GET', resource_path='users', query_monitor=monitor)
+
+        self.assertEqual(response.status_code, 200)
+        report = monitor.last_report
+        self.assertEqual(response['X-Query-Count'], str(report.count))
+        self.assertIn('X-Query-Time', response)
+
+        repeats = report.repeats(monitor.repeat_threshold)
+        self.assertEqual(len(repeats), 1)
+        statement, count, field_labels = repeats[0]
+        self.assertEqual(count, 6)
+        self.assertEqual(field_labels, ['UserResource.groups (GroupCountField)'])
+        self.assertEqual(report.count, 7)
+
+    def test_headers_off_outside_debug(self):
+        monitor = RecordingQueryMonitor()
+
+        response = savory_dispatch(self.root_resource, method='GET', resource_path='users', query_monitor=monitor)
+
+        self.assertFalse(response.has_header('X-Query-Count'))
+        self.assertEqual(monitor.last_report.count, 7)
+        # Django would not have kept them without DEBUG
+        self.assertEqual(connection.queries, [])
+        self.assertIsNone(connection.use_debug_cursor)
+
+    def test_batch_accounted(self):
+        monitor = RecordingQueryMonitor(headers=True)
+        uris = ['http://localhost:8081/api/v2/users/{0}'.format(user.pk) for user in User.objects.all()[:2]]
+
+        response = savory_dispatch_batch(
+            self.root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps({'data': [{'method': 'get', 'uri': uri} for uri in uris]}),
+            base_regex=r'^api/v2/(?P<base_resource>.*)$',
+            max_workers=4,
+            query_monitor=monitor
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response['X-Query-Count']), monitor.last_report.count)
+        fields = [query['field'] for query in monitor.last_report.queries]
+        self.assertEqual(fields.count('UserResource.groups (GroupCountField)'), 2)
@@ -5,15 +5,19 @@ import json
 import unittest
 
 from django.contrib.auth.models import User as DjangoUser
+from django.db.models.signals import post_save
 from django.http import QueryDict
 from savory_pie.django import resources, fields, views
+from savory_pie.django.cache import LRUCache
 from savory_pie.django.filters import ParameterizedFilter
+from savory_pie.django.validators import UniqueTogetherValidator
 from savory_pie.tests.django import user_resource_schema, mock_orm, date_str
 from savory_pie.tests.mock_context import mock_context
 from savory_pie.resources import EmptyParams, _ParamsImpl
 from savory_pie.errors import SavoryPieError
 from savory_pie import formatters
 import django.core.exceptions
+from django.db import IntegrityError
 
 
 class ResourceTest(unittest.TestCase):
@@ -406,6 +410,52 @@ class ModelResourceTest(unittest.TestCase):
         resource.put(mock_context(), {'foo': 'bar'})
 
 
+class ConstraintUserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+
+    validators = [
+        UniqueTogetherValidator('name', 'age', constraint='users_name_age_uniq'),
+    ]
+
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+        fields.AttributeField(attribute='age', type=int)
+    ]
+
+
+@patch('savory_pie.django.resources.router', Mock(name='router'))
+@patch('savory_pie.django.resources.transaction')
+class ConstraintValidationTest(unittest.TestCase):
+    def test_no_query_before_save(self, transaction):
+        user = User()
+        with patch.object(User, 'objects') as objects:
+            ConstraintUserResource(user).put(mock_context(), {'name': 'Bob', 'age': 20})
+
+        self.assertFalse(objects.filter.called)
+        self.assertTrue(user.save.called)
+        self.assertTrue(transaction.savepoint_commit.called)
+
+    def test_integrity_error_is_validation_error(self, transaction):
+        user = User()
+        user.save.side_effect = IntegrityError('duplicate key value violates unique constraint "users_name_age_uniq"')
+
+        with self.assertRaises(resources.ValidationError) as cm:
+            ConstraintUserResource(user).put(mock_context(), {'name': 'Bob', 'age': 20})
+
+        self.assertEqual(cm.exception.errors, {'ConstraintUserResource': ['This set of fields must be unique.']})
+        self.assertTrue(transaction.savepoint_rollback.called)
+
+    def test_unknown_integrity_error_is_raised(self, transaction):
+        user = User()
+        user.save.side_effect = IntegrityError('null value in column "age" violates not-null constraint')
+
+        with self.assertRaises(IntegrityError):
+            ConstraintUserResource(user).put(mock_context(), {'name': 'Bob', 'age': 20})
+
+        self.assertTrue(transaction.savepoint_rollback.called)
+
+
 class AddressableUserQuerySetResource(resources.QuerySetResource):
     resource_class = AddressableUserResource
 
@@ -564,6 +614,297 @@ class QuerySetResourceTest(unittest.TestCase):
         self.assertIsNone(model_resource)
 
 
+class BulkUserQuerySetResource(resources.QuerySetResource):
+    resource_class = AddressableUserResource
+    filters = [ParameterizedFilter('name', 'name')]
+    allow_bulk_delete = True
+    bulk_update_fields = ['age']
+
+
+class QuerySetResourceBulkTest(unittest.TestCase):
+    def make_queryset(self, count=2):
+        queryset = Mock(name='queryset')
+        queryset.all.return_value = queryset
+        queryset.filter.return_value = queryset
+        queryset.order_by.return_value = queryset
+        queryset.update.return_value = count
+        queryset.count.return_value = count
+        return queryset
+
+    def make_context(self, query_string):
+        ctx = mock_context()
+        ctx.request = Mock(GET=QueryDict(query_string))
+        return ctx
+
+    def test_bulk_methods_not_allowed_by_default(self):
+        resource = AddressableUserQuerySetResource(mock_orm.QuerySet())
+        self.assertEqual(resource.allowed_methods, {'GET', 'POST'})
+
+    def test_bulk_methods_allowed(self):
+        resource = BulkUserQuerySetResource(mock_orm.QuerySet())
+        self.assertEqual(resource.allowed_methods, {'GET', 'POST', 'PUT', 'DELETE'})
+        self.assertFalse(resource.supports_if_match)
+
+    def test_own_put_and_delete_allowed(self):
+        class OwnPutQuerySetResource(AddressableUserQuerySetResource):
+            def put(self, ctx, source_dict):
+                pass
+
+            def delete(self, ctx):
+                pass
+
+        resource = OwnPutQuerySetResource(mock_orm.QuerySet())
+        self.assertEqual(resource.allowed_methods, {'GET', 'POST', 'PUT', 'DELETE'})
+        self.assertTrue(resource.supports_if_match)
+
+    def test_bulk_update(self):
+        queryset = self.make_queryset()
+        resource = BulkUserQuerySetResource(queryset)
+
+        result = resource.put(self.make_context('name=Bob'), {'age': '21'})
+
+        self.assertTrue(queryset.filter.called)
+        queryset.update.assert_called_with(age=21)
+        self.assertEqual(result, {'meta': {'affectedCount': 2}})
+
+    def test_bulk_update_restricted_fields(self):
+        queryset = self.make_queryset()
+        resource = BulkUserQuerySetResource(queryset)
+
+        with self.assertRaises(resources.ValidationError) as cm:
+            resource.put(self.make_context('name=Bob'), {'age': 21, 'name': 'Alice'})
+
+        self.assertEqual(cm.exception.errors, {'invalidBulkFields': ['name']})
+        self.assertFalse(queryset.update.called)
+
+    def test_bulk_update_requires_filter(self):
+        queryset = self.make_queryset()
+        resource = BulkUserQuerySetResource(queryset)
+
+        with self.assertRaises(resources.ValidationError) as cm:
+            resource.put(self.make_context('other=Bob'), {'age': 21})
+
+        self.assertEqual(cm.exception.errors, {'unfilteredBulkRequest': ['name']})
+        self.assertFalse(queryset.update.called)
+
+    @patch('savory_pie.django.resources.transaction.atomic')
+    def test_bulk_delete(self, atomic):
+        queryset = self.make_queryset(count=3)
+        resource = BulkUserQuerySetResource(queryset)
+        calls = Mock()
+        calls.attach_mock(atomic.return_value.__enter__, 'enter')
+        calls.attach_mock(queryset.count, 'count')
+        calls.attach_mock(queryset.delete, 'delete')
+        calls.attach_mock(atomic.return_value.__exit__, 'exit')
+
+        result = resource.delete(self.make_context('name=Bob'))
+
+        self.assertEqual([call[0] for call in calls.mock_calls], ['enter', 'count', 'delete', 'exit'])
+        self.assertEqual(result, {'meta': {'affectedCount': 3}})
+
+    def test_bulk_delete_requires_filter(self):
+        queryset = self.make_queryset()
+        resource = BulkUserQuerySetResource(queryset)
+
+        with self.assertRaises(resources.ValidationError):
+            resource.delete(self.make_context(''))
+
+        self.assertFalse(queryset.delete.called)
+
+
+class QuerySetResourceExportTest(unittest.TestCase):
+    def make_resource(self):
+        resource = AddressableUserQuerySetResource(mock_orm.QuerySet(*[
+            User(pk=pk, name=name, age=20 + pk)
+            for pk, name in [(3, 'Carol'), (1, 'Alice'), (5, 'Eve'), (2, 'Bob'), (4, 'Dave')]
+        ]))
+        resource.allow_export = True
+        resource.export_chunk_size = 2
+        resource.filters = [ParameterizedFilter('max_age', 'age__lte')]
+        return resource
+
+    def test_export(self):
+        resource = self.make_resource()
+        ctx = mock_context()
+        ctx.set_header = Mock()
+
+        with patch.object(resource, 'prepare_queryset', wraps=resource.prepare_queryset) as prepare_queryset:
+            lines = list(resource.get(ctx, _ParamsImpl(QueryDict('export=ndjson&maxAge=24'))))
+
+        self.assertTrue(ctx.streaming_response)
+        ctx.set_header.assert_called_with('Content-Type', 'application/x-ndjson')
+        self.assertTrue(all(line.endswith('\n') for line in lines))
+        objects = [json.loads(line) for line in lines]
+        self.assertEqual([obj['name'] for obj in objects[:-1]], ['Alice', 'Bob', 'Carol', 'Dave'])
+        self.assertIn('$hash', objects[0])
+        self.assertEqual(objects[-1], {'meta': {'count': 4, 'resourceUri': 'uri://users'}})
+        # Two full chunks and the empty one that ends the export
+        self.assertEqual(prepare_queryset.call_count, 3)
+
+    def test_export_not_allowed(self):
+        resource = self.make_resource()
+        resource.allow_export = False
+
+        data = resource.get(mock_context(), _ParamsImpl(QueryDict('export=ndjson')))
+        self.assertEqual(data['meta']['count'], 5)
+
+
+class CacheValidatorsTest(unittest.TestCase):
+    def test_model_resource_without_version(self):
+        resource = AddressableUserResource(User(pk=1, name='Alice'))
+        self.assertIsNone(resource.get_cache_validators(mock_context(), EmptyParams()))
+
+    def test_model_resource_version(self):
+        resource_class = type('VersionedUserResource', (AddressableUserResource,), {'version_attribute': 'modified'})
+        user = User(pk=1, name='Alice', modified=datetime(2013, 1, 2))
+        ctx = mock_context()
+
+        etag, last_modified = resource_class(user).get_cache_validators(ctx, EmptyParams())
+        self.assertEqual(last_modified, datetime(2013, 1, 2))
+
+        user.modified = datetime(2013, 1, 3)
+        self.assertNotEqual(resource_class(user).get_cache_validators(ctx, EmptyParams())[0], etag)
+
+    def test_model_resource_embedding_without_fragment_cache(self):
+        resource_class = type('VersionedComplexUserResource', (ComplexUserResource,), {'version_attribute': 'modified'})
+        user = User(pk=1, name='Alice', modified=datetime(2013, 1, 2))
+        self.assertIsNone(resource_class(user).get_cache_validators(mock_context(), EmptyParams()))
+
+        resource_class.fragment_cache = LRUCache()
+        self.assertIsNotNone(resource_class(user).get_cache_validators(mock_context(), EmptyParams()))
+
+    def test_queryset_resource_unconditional(self):
+        queryset = Mock(name='queryset')
+        resource = AddressableUserQuerySetResource(queryset)
+        resource.last_modified_attribute = 'modified'
+
+        self.assertIsNone(resource.get_cache_validators(mock_context(), _ParamsImpl(QueryDict('name=Alice'))))
+        self.assertFalse(queryset.aggregate.called)
+
+    def test_queryset_resource_aggregates(self):
+        queryset = Mock(name='queryset')
+        queryset.all.return_value = queryset
+        queryset.distinct.return_value = queryset
+        queryset.filter.return_value = queryset
+        queryset.aggregate.return_value = {'last_modified': datetime(2013, 1, 2), 'count': 2}
+        resource = AddressableUserQuerySetResource(queryset)
+        resource.last_modified_attribute = 'modified'
+        ctx = mock_context()
+        ctx.request = Mock(META={'HTTP_IF_NONE_MATCH': '"abc"'})
+
+        etag, last_modified = resource.get_cache_validators(ctx, _ParamsImpl(QueryDict('name=Alice')))
+
+        self.assertEqual(last_modified, datetime(2013, 1, 2))
+        self.assertTrue(queryset.aggregate.called)
+        self.assertNotEqual(resource.get_cache_validators(ctx, _ParamsImpl(QueryDict('name=Bob')))[0], etag)
+
+        queryset.aggregate.return_value = {'last_modified': datetime(2013, 1, 2), 'count': 1}
+        self.assertNotEqual(resource.get_cache_validators(ctx, _ParamsImpl(QueryDict('name=Alice')))[0], etag)
+
+    def test_queryset_resource_embedding_without_fragment_cache(self):
+        queryset = Mock(name='queryset')
+        queryset.all.return_value = queryset
+        queryset.distinct.return_value = queryset
+        queryset.filter.return_value = queryset
+        queryset.aggregate.return_value = {'last_modified': datetime(2013, 1, 2), 'count': 2}
+        resource_class = type('FragmentComplexUserResource', (ComplexUserResource,), {})
+        resource = type('ComplexUserQuerySetResource', (resources.QuerySetResource,), {
+            'resource_class': resource_class,
+            'last_modified_attribute': 'modified',
+        })(queryset)
+        ctx = mock_context()
+        ctx.request = Mock(META={'HTTP_IF_NONE_MATCH': '"abc"'})
+
+        self.assertIsNone(resource.get_cache_validators(ctx, EmptyParams()))
+        self.assertFalse(queryset.aggregate.called)
+
+        resource_class.fragment_cache = LRUCache()
+        etag = resource.get_cache_validators(ctx, EmptyParams())[0]
+        # Saving an embedded model invalidates the fragments, and the ETag with them
+        resource_class.invalidate_fragments()
+        self.assertNotEqual(resource.get_cache_validators(ctx, EmptyParams())[0], etag)
+
+
+class QuerySetResourceFragmentCacheTest(unittest.TestCase):
+    def make_resource(self, *users, **attrs):
+        resource_class = type('FragmentUserResource', (AddressableUserResource,), dict(
+            fragment_cache=LRUCache(),
+            **attrs
+        ))
+        queryset_resource_class = type('FragmentUserQuerySetResource', (resources.QuerySetResource,), {
+            'resource_class': resource_class
+        })
+        return queryset_resource_class(mock_orm.QuerySet(*users))
+
+    def names(self, data):
+        return sorted(obj['name'] for obj in data['objects'])
+
+    def test_fragments_reused_until_version_changes(self):
+        alice = User(pk=1, name='Alice', age=31, version=1)
+        bob = User(pk=2, name='Bob', age=20, version=1)
+        resource = self.make_resource(alice, bob, version_attribute='version')
+        ctx = mock_context()
+
+        self.assertEqual(self.names(resource.get(ctx, EmptyParams())), ['Alice', 'Bob'])
+
+        alice.name = 'Alicia'
+        bob.name = 'Robert'
+        bob.version = 2
+        data = resource.get(ctx, EmptyParams())
+
+        self.assertEqual(self.names(data), ['Alice', 'Robert'])
+        self.assertEqual(data['meta']['count'], 2)
+        self.assertTrue(all('$hash' in obj for obj in data['objects']))
+
+    def test_generation_read_once_per_page(self):
+        users = [User(pk=pk, name='User {0}'.format(pk), age=20) for pk in range(1, 21)]
+        resource = self.make_resource(*users)
+        resource.get(mock_context(), EmptyParams())
+
+        resource_class = resource.resource_class
+        cache = resource_class.fragment_cache
+        with patch.object(cache, 'get', wraps=cache.get) as get:
+            resource.get(mock_context(), EmptyParams())
+        generation_key = resource_class._get_fragment_generation_key()
+        self.assertEqual([args[0] for args, kwargs in get.call_args_list].count(generation_key), 1)
+
+    def test_embedded_model_save_invalidates(self):
+        class Manager(mock_orm.Model):
+            name = Mock()
+
+        class ManagerResource(resources.ModelResource):
+            model_class = Manager
+            fields = [fields.AttributeField(attribute='name', type=str)]
+
+        manager = Manager(pk=5, name='Carol')
+        alice = User(pk=1, name='Alice', age=31, manager=manager)
+        resource = self.make_resource(alice, fields=[
+            fields.AttributeField(attribute='name', type=str),
+            fields.SubModelResourceField(attribute='manager', resource_class=ManagerResource),
+        ])
+        ctx = mock_context()
+
+        resource.get(ctx, EmptyParams())
+        manager.name = 'Dave'
+        self.assertEqual(resource.get(ctx, EmptyParams())['objects'][0]['manager'], {'name': 'Carol'})
+
+        post_save.send(sender=Manager, instance=manager, created=False)
+        self.assertEqual(resource.get(ctx, EmptyParams())['objects'][0]['manager'], {'name': 'Dave'})
+
+    def test_generation_set_by_another_process(self):
+        alice = User(pk=1, name='Alice', age=31)
+        resource = self.make_resource(alice)
+        resource_class = resource.resource_class
+        # A shared cache already holds the generation when this process starts
+        resource_class.fragment_cache.set(resource_class._get_fragment_generation_key(), 'generation')
+        ctx = mock_context()
+
+        resource.get(ctx, EmptyParams())
+        alice.name = 'Alicia'
+        post_save.send(sender=User, instance=alice, created=False)
+        self.assertEqual(self.names(resource.get(ctx, EmptyParams())), ['Alicia'])
+
+
 class ResourcePrepareTest(unittest.TestCase):
     class TestResource(resources.ModelResource):
         model_class = User
@@ -680,3 +1021,41 @@ class SchemaResourceTest(unittest.TestCase):
 
     def test_field_date_joined(self):
         self.do_assert_date_equal('dateJoined')
+
+    def test_schema_computed_once(self):
+        resources._schemas.clear()
+        resources._schema_hashes.clear()
+        with patch.object(resources.SchemaResource, '_build_schema', return_value={'fields': {}}) as build_schema:
+            resources.SchemaResource.warm(DjangoUserResource)
+            first = self.do_get()
+            first['fields']['name'] = 'modified'
+            second = self.do_get()
+
+        self.assertEqual(build_schema.call_count, 1)
+        self.assertEqual(second['fields'], {})
+        self.assertEqual(second['resourceUri'], 'uri://user/schema/')
+        resources._schemas.clear()
+        resources._schema_hashes.clear()
+
+    def test_allowed_methods_not_cached(self):
+        resource_class = type('MethodsUserResource', (DjangoUserResource,), {'allowed_methods': set(['GET'])})
+        resource = resources.SchemaResource(resource_class)
+        ctx = mock_context()
+        ctx.build_resource_uri = lambda resource: 'uri://user/schema/'
+        etag = resource.get_cache_validators(ctx, EmptyParams())[0]
+        self.assertEqual(resource.get(ctx)['allowedDetailHttpMethods'], ['get'])
+
+        resource_class.allowed_methods = set(['GET', 'PUT'])
+        self.assertEqual(sorted(resource.get(ctx)['allowedDetailHttpMethods']), ['get', 'put'])
+        self.assertEqual(sorted(resource.get(ctx)['allowedListHttpMethods']), ['get', 'put'])
+        self.assertNotEqual(resource.get_cache_validators(ctx, EmptyParams())[0], etag)
+
+    def test_cache_validators(self):
+        resource = resources.SchemaResource(DjangoUserResource)
+        ctx = mock_context()
+        ctx.build_resource_uri = lambda resource: 'uri://user/schema/'
+        etag, last_modified = resource.get_cache_validators(ctx, EmptyParams())
+
+        self.assertEqual(resource.get_cache_validators(ctx, EmptyParams()), (etag, None))
+        ctx.build_resource_uri = lambda resource: 'uri://other/schema/'
+        self.assertNotEqual(resource.get_cache_validators(ctx, EmptyParams())[0], etag)
@@ -0,0 +1,87 @@
+import json
+import sqlite3
+import unittest
+
+from django.db import DatabaseError, IntegrityError, transaction
+from mock import Mock, patch
+
+from savory_pie.django.retry import RetryPolicy
+from savory_pie.tests.django.mock_request import savory_dispatch
+from savory_pie.tests.django.test_views import mock_resource
+
+
+def serialization_failure():
+    error = DatabaseError('could not serialize access due to concurrent update')
+    error.__cause__ = Mock(pgcode='40001', args=())
+    return error
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(serialization_failure()))
+        self.assertTrue(policy.is_retryable(DatabaseError(1213, 'Deadlock found')))
+        self.assertTrue(policy.is_retryable(DatabaseError(sqlite3.OperationalError('database is locked'))))
+        # A programming error, not a transient one
+        self.assertFalse(policy.is_retryable(transaction.TransactionManagementError()))
+        self.assertFalse(policy.is_retryable(IntegrityError('duplicate key')))
+        self.assertFalse(policy.is_retryable(ValueError()))
+
+    def test_delay_is_bounded(self):
+        policy = RetryPolicy(backoff=0.1, max_backoff=0.3)
+        for attempt in range(1, 6):
+            self.assertTrue(0 <= policy.get_delay(attempt) <= 0.3)
+
+    @patch('savory_pie.django.retry.time.sleep')
+    def test_gives_up_after_max_attempts(self, sleep):
+        policy = RetryPolicy(max_attempts=2)
+        self.assertTrue(policy.should_retry(serialization_failure(), 1))
+        self.assertFalse(policy.should_retry(serialization_failure(), 2))
+        self.assertEqual(policy.retries, 1)
+        self.assertEqual(policy.exhausted, 1)
+        self.assertEqual(sleep.call_count, 1)
+
+
+@patch('savory_pie.django.retry.time.sleep')
+class RetryViewTest(unittest.TestCase):
+
+    def create_resource(self, *side_effect):
+        resource = mock_resource(name='root')
+        resource.allowed_methods.add('PUT')
+        resource.put = Mock(side_effect=side_effect)
+        return resource
+
+    def test_put_retried(self, sleep):
+        resource = self.create_resource(serialization_failure(), {'foo': 'bar'})
+        policy = RetryPolicy()
+
+        response = savory_dispatch(resource, method='PUT', body='{"foo": "bar"}', retry_policy=policy)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(resource.put.call_count, 2)
+        first, second = resource.put.call_args_list
+        self.assertEqual(first[0][1], {'foo': 'bar'})
+        self.assertEqual(second[0][1], {'foo': 'bar'})
+        self.assertIsNot(first[0][1], second[0][1])
+        self.assertEqual(policy.retries, 1)
+
+    def test_put_not_retried_without_policy(self, sleep):
+        resource = self.create_resource(serialization_failure(), {'foo': 'bar'})
+
+        response = savory_dispatch(resource, method='PUT', body='{"foo": "bar"}')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(resource.put.call_count, 1)
+
+    def test_transaction_management_error_not_retried(self, sleep):
+        resource = self.create_resource(*[transaction.TransactionManagementError()] * 2)
+        policy = RetryPolicy(max_attempts=2)
+
+        response = savory_dispatch(resource, method='PUT', body='{"foo": "bar"}', retry_policy=policy)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('resource', json.loads(response.content))
+        self.assertEqual(resource.put.call_count, 1)
+        self.assertEqual(policy.retries, 0)
+        self.assertFalse(sleep.called)
@@ -0,0 +1,104 @@
+import json
+import unittest
+
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connections
+
+from savory_pie.django import fields, resources, views
+from savory_pie.django.cache import LRUCache, ResponseCache
+from savory_pie.resources import APIResource
+from savory_pie.tests.django.mock_request import savory_dispatch
+
+
+class UserResource(resources.ModelResource):
+    parent_resource_path = 'users'
+    model_class = User
+    fields = [
+        fields.AttributeField('username', type=str),
+    ]
+
+
+class UserQuerySetResource(resources.QuerySetResource):
+    resource_class = UserResource
+
+
+class ReadDatabaseTest(unittest.TestCase):
+    """
+    Runs against two SQLite databases, default and replica, that are never
+    synchronized, so where each read went is visible.
+    """
+    databases = ['default', 'replica']
+
+    def setUp(self):
+        for alias in self.databases:
+            statements, pending = connections[alias].creation.sql_create_model(User, no_style())
+            cursor = connections[alias].cursor()
+            for statement in statements:
+                cursor.execute(statement)
+        User.objects.using('default').create(username='primary')
+        User.objects.using('replica').create(username='replica')
+
+        self.root_resource = APIResource()
+        self.root_resource.register(UserQuerySetResource(User.objects.all()))
+
+    def tearDown(self):
+        for alias in self.databases:
+            connections[alias].cursor().execute('DROP TABLE auth_user')
+
+    def get_usernames(self, **kwargs):
+        response = savory_dispatch(self.root_resource, method='GET', resource_path='users', **kwargs)
+        return [obj['username'] for obj in json.loads(response.content)['objects']]
+
+    def test_get_reads_replica(self):
+        self.assertEqual(self.get_usernames(), ['primary'])
+        self.assertEqual(self.get_usernames(read_database='replica'), ['replica'])
+
+    def test_get_detail_reads_replica(self):
+        replica_user = User.objects.using('replica').get(username='replica')
+        response = savory_dispatch(
+            self.root_resource,
+            method='GET',
+            resource_path='users/{0}'.format(replica_user.pk),
+            read_database='replica'
+        )
+        self.assertEqual(json.loads(response.content)['username'], 'replica')
+
+    def test_write_sticks_to_primary(self):
+        response = savory_dispatch(
+            self.root_resource,
+            method='POST',
+            resource_path='users',
+            body=json.dumps({'username': 'written'}),
+            read_database='replica'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.using('default').filter(username='written').exists())
+        self.assertFalse(User.objects.using('replica').filter(username='written').exists())
+
+        cookie = response.cookies[views.READ_PRIMARY_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        usernames = self.get_usernames(read_database='replica', COOKIES={cookie.key: cookie.value})
+        self.assertEqual(sorted(usernames), ['primary', 'written'])
+
+    def test_replica_reads_do_not_fill_response_cache(self):
+        cache = ResponseCache()
+        self.assertEqual(self.get_usernames(read_database='replica', response_cache=cache), ['replica'])
+        self.assertEqual(self.get_usernames(response_cache=cache), ['primary'])
+        # Served what the primary stored
+        self.assertEqual(self.get_usernames(read_database='replica', response_cache=cache), ['primary'])
+
+    def test_replica_reads_do_not_fill_fragment_cache(self):
+        resource_class = type('FragmentUserResource', (UserResource,), {'fragment_cache': LRUCache()})
+        queryset_resource_class = type('FragmentUserQuerySetResource', (UserQuerySetResource,), {
+            'resource_class': resource_class
+        })
+        self.root_resource = APIResource()
+        self.root_resource.register(queryset_resource_class(User.objects.all()))
+        replica_user = User.objects.using('replica').get()
+        replica_user.pk = User.objects.using('default').get().pk
+        replica_user.save(using='replica')
+
+        self.assertEqual(self.get_usernames(read_database='replica'), ['replica'])
+        self.assertEqual(self.get_usernames(), ['primary'])
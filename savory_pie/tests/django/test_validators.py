@@ -1,9 +1,11 @@
 import pytz
 import unittest
 from datetime import datetime, timedelta
+from mock import Mock, patch
 
 import django
-from django.db import models
+from django.db import IntegrityError, models
+from django.db.models.fields import FieldDoesNotExist
 
 from savory_pie import fields as base_fields
 from savory_pie.django import resources, fields
@@ -23,6 +25,11 @@ from savory_pie.django.validators import (
     IntFieldRangeValidator,
     DatetimeFieldMinValidator,
     DatetimeFieldMaxValidator,
+    get_validation_plan,
+    validate_all,
+    UniqueTogetherValidator,
+    UniquePairedFieldValidator,
+    UniquenessChecks,
 )
 
 
@@ -305,6 +312,190 @@ class OptionalValidationTestCase(ValidationTestCase):
         self.assertEqual({}, errors)
 
 
+class ValidationPlanTestCase(ValidationTestCase):
+
+    def test_plan_is_cached_per_class(self):
+        ctx = mock_context()
+        plan = get_validation_plan(ctx, UserTestResource(User()))
+        self.assertIs(plan, get_validation_plan(ctx, UserTestResource(User())))
+        self.assertIs(plan, get_validation_plan(ctx, UserTestResource))
+
+    def test_plan_steps(self):
+        plan = get_validation_plan(mock_context(), UserTestResource)
+        self.assertEqual(
+            [step.public_key for step in plan.steps],
+            ['name', 'age', 'before', 'after', 'systolicBp', 'vehicle', 'stolenVehicle']
+        )
+        age_step = plan.steps[1]
+        self.assertEqual(len(age_step.validators), 2)
+        # AttributeField validators run directly, not a second time through validate_resource
+        self.assertIsNone(age_step.validate_resource)
+        self.assertIsNotNone(plan.steps[5].validate_resource)
+
+    def test_instance_fields_are_not_cached(self):
+        resource = RequiredCarTestResource(Car())
+        resource.fields = [
+            fields.AttributeField(attribute='make', type=str, validator=StringFieldExactMatchValidator('Toyota')),
+        ]
+        errors = validate(mock_context(), 'car', resource, {'make': 'Honda', 'year': 2012})
+        self.assertEqual({'car.make': ['This should exactly match the expected value.']}, errors)
+
+        plan = get_validation_plan(mock_context(), RequiredCarTestResource)
+        self.assertEqual([step.public_key for step in plan.steps], ['make', 'year'])
+
+    def test_unchanged_value_is_not_validated(self):
+        car = create_car('Honda', 2012)
+        errors = validate(mock_context(), 'car', CarTestResource(car), {'make': 'Honda', 'year': '2012', 'ugly': False})
+        self.assertEqual({}, errors)
+
+
+class UniqueCarTestResource(resources.ModelResource):
+    parent_resource_path = 'cars'
+    model_class = Car
+
+    validators = [
+        UniqueTogetherValidator('make', 'year'),
+        UniquePairedFieldValidator('make', 'ugly', error_message='make is already paired'),
+    ]
+
+    fields = [
+        fields.AttributeField(attribute='make', type=str),
+        fields.AttributeField(attribute='year', type=int),
+        fields.AttributeField(attribute='ugly', type=bool),
+    ]
+
+
+class UniquenessValidationTestCase(ValidationTestCase):
+
+    def patch_rows(self, *rows):
+        objects = Mock(name='objects')
+        objects.filter.return_value.values.return_value = list(rows)
+        return patch.object(Car, 'objects', objects)
+
+    def test_checks_share_one_query(self):
+        existing = {'pk': 1, 'make': u'Toyota', 'year': 2010, 'ugly': False}
+        with self.patch_rows(existing) as objects:
+            errors = validate_all(mock_context(), [
+                ('first', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': '2010', 'ugly': False}),
+                ('second', UniqueCarTestResource(Car()), {'make': 'Honda', 'year': '2010', 'ugly': False}),
+                ('third', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': '2011', 'ugly': True}),
+            ])
+
+        self.assertEqual(objects.filter.call_count, 1)
+        self.assertEqual(errors, {
+            'first': ['This set of fields must be unique.'],
+            'third': ['make is already paired'],
+        })
+
+    def test_case_insensitive_collation(self):
+        # The database matched 'toyota' and 'Citroen' to these rows
+        existing = [
+            {'pk': 1, 'make': u'Toyota', 'year': 2010, 'ugly': False},
+            {'pk': 2, 'make': u'Citro\xebn', 'year': 2011, 'ugly': False},
+        ]
+        with self.patch_rows(*existing):
+            errors = validate_all(mock_context(), [
+                ('first', UniqueCarTestResource(Car()), {'make': 'toyota', 'year': 2010, 'ugly': False}),
+                ('second', UniqueCarTestResource(Car()), {'make': 'Citroen', 'year': 2011, 'ugly': False}),
+                ('third', UniqueCarTestResource(Car()), {'make': 'toyota', 'year': 2012, 'ugly': False}),
+            ])
+        self.assertEqual(errors, {
+            'first': ['This set of fields must be unique.'],
+            'second': ['This set of fields must be unique.'],
+        })
+
+    def test_case_sensitive_collation(self):
+        # Matched exactly, the row says nothing about checks differing in case
+        existing = {'pk': 1, 'make': u'Toyota', 'year': 2010, 'ugly': False}
+        with self.patch_rows(existing):
+            errors = validate_all(mock_context(), [
+                ('first', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2010, 'ugly': False}),
+                ('second', UniqueCarTestResource(Car()), {'make': 'toyota', 'year': 2010, 'ugly': False}),
+            ])
+        self.assertEqual(errors, {'first': ['This set of fields must be unique.']})
+
+    def test_existing_object_does_not_conflict_with_itself(self):
+        existing = {'pk': 1, 'make': u'Toyota', 'year': 2010, 'ugly': False}
+        car = Car(pk=1, make='Honda', year=2010, ugly=False)
+        with self.patch_rows(existing):
+            errors = validate(mock_context(), 'car', UniqueCarTestResource(car), {'make': 'Toyota', 'year': 2010, 'ugly': False})
+        self.assertEqual(errors, {})
+
+    def test_duplicates_within_payload(self):
+        with self.patch_rows():
+            errors = validate_all(mock_context(), [
+                ('car', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2010, 'ugly': False}),
+                ('car', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': '2010', 'ugly': False}),
+            ])
+        self.assertEqual(errors, {'car': ['This set of fields must be unique.']})
+
+    def test_paired_conflict_within_payload(self):
+        with self.patch_rows():
+            errors = validate_all(mock_context(), [
+                ('first', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2010, 'ugly': False}),
+                ('second', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2011, 'ugly': False}),
+                ('third', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2012, 'ugly': True}),
+            ])
+        self.assertEqual(errors, {'third': ['make is already paired']})
+
+    def test_paired_conflict_within_payload_without_batching(self):
+        with self.patch_rows() as objects, patch.object(UniquenessChecks, '_coercers', side_effect=FieldDoesNotExist):
+            objects.filter.return_value.exists.return_value = False
+            objects.filter.return_value.exclude.return_value.exists.return_value = False
+            errors = validate_all(mock_context(), [
+                ('first', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2010, 'ugly': False}),
+                ('second', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2012, 'ugly': True}),
+            ])
+        self.assertEqual(errors, {'second': ['make is already paired']})
+
+    def test_find_errors_outside_validate(self):
+        error_dict = {}
+        existing = {'pk': 1, 'make': u'Toyota', 'year': 2010}
+        with self.patch_rows(existing):
+            UniqueTogetherValidator('make', 'year').find_errors(
+                error_dict, mock_context(), 'car', UniqueCarTestResource(Car()), {'make': 'Toyota', 'year': 2010}
+            )
+        self.assertEqual(error_dict, {'car': ['This set of fields must be unique.']})
+
+
+class ConstraintValidationTestCase(ValidationTestCase):
+
+    def violated(self, validator, message):
+        error_dict = {}
+        violated = validator.find_integrity_errors(
+            error_dict, mock_context(), 'car', UniqueCarTestResource(Car()), IntegrityError(message)
+        )
+        self.assertEqual(bool(error_dict), violated)
+        return violated
+
+    def test_columns(self):
+        validator = UniqueTogetherValidator('make', 'year', constraint=True)
+        for message in [
+            'duplicate key value violates unique constraint "car_make_year_key"\n'
+            'DETAIL:  Key (make, year)=(Toyota, 2010) already exists.',
+            'UNIQUE constraint failed: tests_car.make, tests_car.year',
+            'columns year, make are not unique',
+        ]:
+            self.assertTrue(self.violated(validator, message), message)
+
+    def test_other_columns(self):
+        validator = UniqueTogetherValidator('make', 'year', constraint=True)
+        for message in [
+            'DETAIL:  Key (make_id, year)=(1, 2010) already exists.',
+            'UNIQUE constraint failed: tests_car.make, tests_car.year, tests_car.ugly',
+            'column automake is not unique',
+            # MySQL only names the index
+            "Duplicate entry 'Toyota-2010' for key 'make'",
+        ]:
+            self.assertFalse(self.violated(validator, message), message)
+
+    def test_constraint_name(self):
+        validator = UniqueTogetherValidator('make', 'year', constraint='car_make_year')
+        self.assertTrue(self.violated(validator, "Duplicate entry 'Toyota-2010' for key 'car_make_year'"))
+        self.assertTrue(self.violated(validator, 'duplicate key value violates unique constraint "car_make_year"'))
+        self.assertFalse(self.violated(validator, "Duplicate entry 'Toyota-2010' for key 'car_make_year_ugly'"))
+
+
 class SimpleValidationTestCase(ValidationTestCase):
 
     def test_okay(self):
@@ -1,6 +1,9 @@
 import unittest
+import gzip
 import json
+import threading
 from datetime import datetime
+from StringIO import StringIO
 
 import mock
 from mock import Mock, patch
@@ -8,8 +11,10 @@ from savory_pie.errors import AuthorizationError, PreConditionError
 from savory_pie.formatters import JSONFormatter
 from savory_pie.resources import _ParamsImpl
 from savory_pie.helpers import get_sha1
-from savory_pie.django import validators
-from savory_pie.tests.django.mock_request import savory_dispatch, savory_dispatch_batch
+from savory_pie.django import fields, resources, validators, views
+from savory_pie.resources import APIResource
+from savory_pie.tests.django import mock_orm
+from savory_pie.tests.django.mock_request import Request, savory_dispatch, savory_dispatch_batch
 from savory_pie.tests.mock_context import mock_context
 
 
@@ -171,6 +176,89 @@ class BatchViewTest(unittest.TestCase):
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]['status'], 412)
 
+    def test_put_if_match_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['PUT'],
+            result={'name': 'value'}
+        )
+        ctx = mock_context()
+        ctx.formatter = JSONFormatter()
+        current_etag = get_sha1(ctx, {'name': 'value'})
+
+        request_data = {
+            "data": [
+                dict(self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child', {}), ifMatch='stale'),
+                dict(self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child', {}), ifMatch=current_etag),
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['status'] for item in data], [412, 200])
+
+    def test_get_if_none_match_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+            result={'name': 'value'}
+        )
+        ctx = mock_context()
+        ctx.formatter = JSONFormatter()
+        current_etag = get_sha1(ctx, {'name': 'value'})
+
+        request_data = {
+            "data": [
+                dict(self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}), ifNoneMatch='stale'),
+                dict(
+                    self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}),
+                    ifNoneMatch='"{0}"'.format(current_etag)
+                ),
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['status'] for item in data], [200, 304])
+        self.assertEqual(data[0]['data'], {'name': 'value'})
+        self.assertEqual(data[1]['etag'], current_etag)
+        self.assertNotIn('data', data[1])
+
+    def test_get_if_none_match_cache_validators_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+            result={'name': 'value'}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        child_resource.get_cache_validators = Mock(return_value=('version-1', None))
+
+        request_data = {
+            "data": [
+                dict(self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}), ifNoneMatch='version-1'),
+            ]
+        }
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual(data, [{'uri': 'http://localhost:8081/api/v2/child', 'status': 304, 'etag': 'version-1'}])
+        self.assertFalse(child_resource.get.called)
+
     def test_put_key_error_batch(self):
         root_resource = mock_resource(
             name='root',
@@ -492,6 +580,336 @@ class BatchViewTest(unittest.TestCase):
         self.assertEqual(data[2]['uri'], 'http://localhost:8081/api/v2/child/grandchild')
         self.assertEqual(data[2]['location'], 'some new location')
 
+    def create_failing_write_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['PUT', 'POST'],
+            result={}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        child_resource.post = Mock(side_effect=validators.ValidationError(Mock(), {'class.field': 'broken'}))
+
+        request_data = {
+            "data": [
+                self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child/grandchild', {'id': 1}),
+                self._generate_batch_partial('post', 'http://localhost:8081/api/v2/child', {'id': 2}),
+            ]
+        }
+        return root_resource, json.dumps(request_data)
+
+    @patch('savory_pie.django.views.transaction.atomic')
+    def test_atomic_batch_rolled_back(self, atomic):
+        exits = []
+        atomic.return_value.__exit__ = Mock(side_effect=lambda *exc_info: exits.append(exc_info[1]))
+        root_resource, body = self.create_failing_write_batch()
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=body,
+            transaction_mode='atomic'
+        )
+
+        content = json.loads(response.content)
+        self.assertTrue(content['rolledBack'])
+        self.assertEqual([item['status'] for item in content['data']], [204, 400])
+        # one savepoint per write, then the whole batch
+        self.assertEqual(len(exits), 3)
+        self.assertIsNone(exits[0])
+        self.assertIsInstance(exits[1], validators.ValidationError)
+        self.assertIsInstance(exits[2], views._BatchRollback)
+
+    @patch('savory_pie.django.views.transaction.atomic')
+    def test_savepoint_batch(self, atomic):
+        exits = []
+        atomic.return_value.__exit__ = Mock(side_effect=lambda *exc_info: exits.append(exc_info[1]))
+        root_resource, body = self.create_failing_write_batch()
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=body,
+            transaction_mode='savepoint'
+        )
+
+        content = json.loads(response.content)
+        self.assertNotIn('rolledBack', content)
+        self.assertEqual([item['status'] for item in content['data']], [204, 400])
+        self.assertEqual(len(exits), 3)
+        self.assertIsInstance(exits[1], validators.ValidationError)
+        self.assertIsNone(exits[2])
+
+    def test_streaming_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET', 'PUT'],
+            result={'name': 'value'}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}),
+                self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child/grandchild', {'id': 1}),
+                self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}),
+            ]
+        }
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data),
+            streaming=True
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.has_header('ETag'))
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), '{"data": [')
+        self.assertEqual(json.loads(next(chunks))['status'], 200)
+        # Nothing past the first sub-request has run yet
+        self.assertEqual(child_resource.get.call_count, 1)
+
+        data = json.loads('{"data": [{"status": 200}' + ''.join(chunks))['data']
+        self.assertEqual([item['status'] for item in data], [200, 200, 200])
+        self.assertEqual(data[2]['data'], {'name': 'value'})
+
+    @patch.object(JSONFormatter, 'chunk_size', 16)
+    def test_streaming_batch_reads_as_dispatched(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['PUT'],
+            result={'name': 'value'}
+        )
+        body = json.dumps({
+            "data": [
+                self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child', {'id': 1})
+                for _ in range(10)
+            ]
+        })
+
+        with patch.object(Request, 'read', autospec=True, side_effect=Request.read.im_func) as read:
+            response = savory_dispatch_batch(
+                root_resource,
+                full_host='localhost:8081',
+                method='POST',
+                body=body,
+                streaming=True,
+                formatter=JSONFormatter(max_body_size=len(body))
+            )
+            chunks = iter(response.streaming_content)
+            self.assertEqual(next(chunks), '{"data": [')
+            self.assertEqual(json.loads(next(chunks))['status'], 200)
+            # The first sub-request ran before the rest of the body was read
+            request = read.call_args[0][0]
+            self.assertLess(request.body_file.tell(), len(body))
+
+            data = json.loads('{"data": [{"status": 200}' + ''.join(chunks))['data']
+        self.assertEqual(len(data), 10)
+        self.assertEqual(request.body_file.tell(), len(body))
+
+    def test_malformed_batch_runs_nothing(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['PUT'],
+            result={'name': 'value'}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        body = json.dumps({
+            "data": [self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child', {'id': 1})]
+        })
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            # Truncated after the first sub-request
+            body=body[:-2] + ', {"method": "put"'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(child_resource.put.called)
+
+    @patch('savory_pie.django.views.APIContext.build_resource_uri')
+    def test_references_batch(self, build_resource_uri):
+        build_resource_uri.return_value = 'http://localhost:8081/api/v2/child/grandchild'
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET', 'PUT', 'POST'],
+            result={'name': 'value'}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        grand_child_resource = child_resource.get_child_resource.return_value
+
+        request_data = {
+            "data": [
+                dict(self._generate_batch_partial('post', 'http://localhost:8081/api/v2/child', {'a': 1}), id='parent'),
+                self._generate_batch_partial('put', '${parent.location}', {'parent': '${parent.location}'}),
+                dict(self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}), id='read'),
+                self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child/grandchild', {
+                    'name': 'new ${read.data.name}',
+                    'original': '${read.data}',
+                }),
+            ]
+        }
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['status'] for item in data], [201, 200, 200, 200])
+        self.assertEqual(data[0]['id'], 'parent')
+        self.assertEqual(data[1]['uri'], 'http://localhost:8081/api/v2/child/grandchild')
+        self.assertNotIn('id', data[1])
+        self.assertEqual(
+            [call[0][1] for call in grand_child_resource.put.call_args_list],
+            [
+                {'parent': 'http://localhost:8081/api/v2/child/grandchild'},
+                {'name': 'new value', 'original': {'name': 'value'}},
+            ]
+        )
+
+    def test_duplicate_gets_keep_their_ids(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+            result={'name': 'value'}
+        )
+        uri = 'http://localhost:8081/api/v2/child/grandchild'
+        request_data = {
+            "data": [
+                dict(self._generate_batch_partial('get', uri, {}), id='a'),
+                self._generate_batch_partial('get', uri, {}),
+                dict(self._generate_batch_partial('get', uri, {}), id='c'),
+            ]
+        }
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual(data[0]['id'], 'a')
+        self.assertNotIn('id', data[1])
+        self.assertEqual(data[2]['id'], 'c')
+
+    def test_unresolved_references_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['PUT'],
+            result={}
+        )
+
+        request_data = {
+            "data": [
+                dict(self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child', {}), id='parent'),
+                self._generate_batch_partial('put', '${parent.location}', {}),
+                self._generate_batch_partial('put', 'http://localhost:8081/api/v2/child', {'a': '${missing.data}'}),
+            ]
+        }
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data)
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['status'] for item in data], [405, 424, 400])
+        self.assertEqual(data[2]['validation_errors'], ['Unknown sub-request id missing'])
+
+    def test_concurrent_get_batch(self):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['PUT', 'GET'],
+            result={'name': 'value'}
+        )
+        child_resource = root_resource.get_child_resource.return_value
+        events = []
+        both_running = threading.Event()
+
+        def get(ctx, params):
+            events.append('get')
+            if events.count('get') == 2:
+                both_running.set()
+            # Only returns early when the other GET runs at the same time
+            both_running.wait(2)
+            return {'concurrent': both_running.is_set()}
+
+        def put(ctx, data):
+            events.append('put')
+
+        child_resource.get = Mock(side_effect=get)
+        child_resource.put = Mock(side_effect=put)
+
+        uris = ['http://localhost:8081/api/v2/child?n={0}'.format(n) for n in range(4)]
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', uris[0], {}),
+                self._generate_batch_partial('get', uris[1], {}),
+                self._generate_batch_partial('put', uris[2], {'business_id': 12345}),
+                self._generate_batch_partial('get', uris[3], {}),
+            ]
+        }
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data),
+            max_workers=4
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['uri'] for item in data], uris)
+        self.assertEqual([item['status'] for item in data], [200, 200, 204, 200])
+        self.assertEqual(data[0]['data'], {'concurrent': True})
+        self.assertEqual(data[1]['data'], {'concurrent': True})
+        # The PUT reads the resource before writing it, for If-Match
+        self.assertEqual(events, ['get', 'get', 'get', 'put', 'get'])
+
+    @patch('savory_pie.django.views.connections')
+    def test_concurrent_get_batch_closes_connections(self, connections):
+        root_resource = self.create_root_resource_with_children(
+            r'^api/v2/(?P<base_resource>.*)$',
+            methods=['GET'],
+            result={'name': 'value'}
+        )
+        closing_threads = []
+        connection = Mock(name='connection')
+        connection.close.side_effect = lambda: closing_threads.append(threading.current_thread())
+        connections.all.return_value = [connection]
+
+        request_data = {
+            "data": [
+                self._generate_batch_partial('get', 'http://localhost:8081/api/v2/child?n={0}'.format(n), {})
+                for n in range(2)
+            ]
+        }
+
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps(request_data),
+            max_workers=2
+        )
+
+        self.assertEqual([item['status'] for item in json.loads(response.content)['data']], [200, 200])
+        # Once after every job, by the pool thread that ran it
+        self.assertEqual(len(closing_threads), 2)
+        self.assertNotIn(threading.current_thread(), closing_threads)
+
     def test_one_fails_one_passes(self):
         root_resource = self.create_root_resource_with_children(
             r'^api/v2/(?P<base_resource>.*)$',
@@ -529,6 +947,116 @@ class BatchViewTest(unittest.TestCase):
         self.assertEqual(data[1]['status'], 405)
 
 
+class Car(mock_orm.Model):
+    name = Mock()
+
+
+class CarResource(resources.ModelResource):
+    parent_resource_path = 'cars'
+    model_class = Car
+    fields = [
+        fields.AttributeField(attribute='name', type=str),
+    ]
+
+
+class CountingCarQuerySetResource(resources.QuerySetResource):
+    resource_class = CarResource
+
+    def __init__(self, queryset):
+        super(CountingCarQuerySetResource, self).__init__(queryset)
+        self.prepare_count = 0
+
+    def prepare_queryset(self, ctx, queryset):
+        self.prepare_count += 1
+        return super(CountingCarQuerySetResource, self).prepare_queryset(ctx, queryset)
+
+
+class BatchCoalescingTest(unittest.TestCase):
+    def test_detail_gets_coalesced(self):
+        cars = CountingCarQuerySetResource(mock_orm.QuerySet(
+            Car(pk=1, name='Beetle'),
+            Car(pk=2, name='Mini'),
+        ))
+        root_resource = APIResource()
+        root_resource.register(cars)
+
+        uris = [
+            'http://localhost:8081/api/v2/cars/2',
+            'http://localhost:8081/api/v2/cars/1',
+            'http://localhost:8081/api/v2/cars/2',
+            'http://localhost:8081/api/v2/cars/99',
+        ]
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps({'data': [{'method': 'get', 'uri': uri} for uri in uris]}),
+            base_regex=r'^api/v2/(?P<base_resource>.*)$'
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['uri'] for item in data], uris)
+        self.assertEqual([item['status'] for item in data], [200, 200, 200, 404])
+        self.assertEqual(data[0]['data']['name'], 'Mini')
+        self.assertEqual(data[1]['data']['name'], 'Beetle')
+        self.assertEqual(data[1]['data']['resourceUri'], 'http://localhost:8081/api/v2/cars/1')
+        self.assertEqual(data[2], data[0])
+        self.assertEqual(cars.prepare_count, 1)
+
+    def test_overridden_read_queryset_not_coalesced(self):
+        class HiddenCarQuerySetResource(CountingCarQuerySetResource):
+            def read_queryset(self, ctx):
+                return self.queryset.filter(name='Beetle')
+
+        cars = HiddenCarQuerySetResource(mock_orm.QuerySet(
+            Car(pk=1, name='Beetle'),
+            Car(pk=2, name='Mini'),
+        ))
+        root_resource = APIResource()
+        root_resource.register(cars)
+
+        uris = ['http://localhost:8081/api/v2/cars/1', 'http://localhost:8081/api/v2/cars/2']
+        response = savory_dispatch_batch(
+            root_resource,
+            full_host='localhost:8081',
+            method='POST',
+            body=json.dumps({'data': [{'method': 'get', 'uri': uri, 'body': {}} for uri in uris]}),
+            base_regex=r'^api/v2/(?P<base_resource>.*)$'
+        )
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([item['status'] for item in data], [200, 404])
+        self.assertEqual(cars.prepare_count, 2)
+
+    def test_coalesced_gets_read_queryset(self):
+        cars = CountingCarQuerySetResource(mock_orm.QuerySet(Car(pk=1, name='Beetle'), Car(pk=2, name='Mini')))
+        cars.queryset.using = Mock(return_value=mock_orm.QuerySet(Car(pk=1, name='Replica Beetle')))
+        root_resource = APIResource()
+        root_resource.register(cars)
+
+        def compute_context(*args, **kwargs):
+            ctx = views_compute_context(*args, **kwargs)
+            ctx.read_database = 'replica'
+            return ctx
+
+        views_compute_context = views.compute_context
+        with patch('savory_pie.django.views.compute_context', side_effect=compute_context):
+            response = savory_dispatch_batch(
+                root_resource,
+                full_host='localhost:8081',
+                method='POST',
+                body=json.dumps({'data': [
+                    {'method': 'get', 'uri': 'http://localhost:8081/api/v2/cars/' + key} for key in ['1', '2']
+                ]}),
+                base_regex=r'^api/v2/(?P<base_resource>.*)$'
+            )
+
+        data = json.loads(response.content)['data']
+        cars.queryset.using.assert_called_with('replica')
+        self.assertEqual([item['status'] for item in data], [200, 404])
+        self.assertEqual(data[0]['data']['name'], 'Replica Beetle')
+
+
 class ViewTest(unittest.TestCase):
     def test_unauthorized(self):
         root_resource = mock_resource(name='root')
@@ -553,6 +1081,64 @@ class ViewTest(unittest.TestCase):
         self.assertTrue(root_resource.get.called)
         self.assertIsNotNone(root_resource.get.call_args_list[0].request)
 
+    def test_conditional_get_from_cache_validators(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get_cache_validators = Mock(return_value=('abc', None))
+
+        response = savory_dispatch(root_resource, method='GET', META={'HTTP_IF_NONE_MATCH': '"xyz", "abc"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], 'abc')
+        self.assertFalse(root_resource.get.called)
+
+    def test_conditional_get_modified(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar'})
+        root_resource.get_cache_validators = Mock(return_value=('abc', datetime(2013, 1, 2)))
+
+        response = savory_dispatch(root_resource, method='GET', META={'HTTP_IF_NONE_MATCH': 'xyz'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], 'abc')
+        self.assertIn('Last-Modified', response)
+
+    def test_conditional_get_if_modified_since(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar'})
+        root_resource.get_cache_validators = Mock(return_value=(None, datetime(2013, 1, 2)))
+        last_modified = savory_dispatch(root_resource, method='GET')['Last-Modified']
+
+        response = savory_dispatch(root_resource, method='GET', META={'HTTP_IF_MODIFIED_SINCE': last_modified})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(root_resource.get.call_count, 1)
+
+    def test_conditional_get_from_content_hash(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar'})
+        etag = savory_dispatch(root_resource, method='GET')['ETag']
+
+        response = savory_dispatch(root_resource, method='GET', META={'HTTP_IF_NONE_MATCH': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, '')
+
+    def test_conditional_get_from_content_hash_with_cache_validators(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('GET')
+        root_resource.get = Mock(return_value={'foo': 'bar'})
+        etag = savory_dispatch(root_resource, method='GET')['ETag']
+        root_resource.get_cache_validators = Mock(return_value=('abc', None))
+
+        response = savory_dispatch(root_resource, method='GET', META={'HTTP_IF_NONE_MATCH': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], 'abc')
+
     def test_get_success_streaming(self):
         def get(ctx, params):
             ctx.streaming_response = True
@@ -581,6 +1167,60 @@ class ViewTest(unittest.TestCase):
         response = savory_dispatch(root_resource, method='GET')
         self.assertEqual(response.status_code, 405)
 
+    def create_large_resource(self):
+        resource = mock_resource(name='root')
+        resource.allowed_methods.add('GET')
+        resource.get.return_value = {'items': ['value'] * 100}
+        return resource
+
+    def test_get_compressed(self):
+        resource = self.create_large_resource()
+        plain = savory_dispatch(resource, method='GET')
+
+        response = savory_dispatch(
+            resource,
+            method='GET',
+            META={'HTTP_ACCEPT_ENCODING': 'deflate, gzip;q=0.5'},
+            compression_threshold=200
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], plain['ETag'])
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(response.content)).read(), plain.content)
+
+    def test_get_not_compressed(self):
+        resource = self.create_large_resource()
+        for encoding, threshold in [('gzip;q=0', 200), ('identity', 200), ('gzip', 100000)]:
+            response = savory_dispatch(
+                resource,
+                method='GET',
+                META={'HTTP_ACCEPT_ENCODING': encoding},
+                compression_threshold=threshold
+            )
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(json.loads(response.content), {'items': ['value'] * 100})
+
+    def test_streaming_get_compressed(self):
+        resource = mock_resource(name='root')
+        resource.allowed_methods.add('GET')
+
+        def get(ctx, params):
+            ctx.streaming_response = True
+            return iter(['{"items": [', '"value"', ']}'])
+        resource.get.side_effect = get
+
+        response = savory_dispatch(
+            resource,
+            method='GET',
+            META={'HTTP_ACCEPT_ENCODING': 'gzip'},
+            compression_threshold=1000
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = ''.join(response.streaming_content)
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(content)).read(), '{"items": ["value"]}')
+
     def test_put_no_content_success(self):
         root_resource = mock_resource(name='root')
         root_resource.allowed_methods.add('PUT')
@@ -623,6 +1263,52 @@ class ViewTest(unittest.TestCase):
         self.assertEqual(response.content, '{"key": "value"}')
         self.assertIsNotNone(root_resource.put.call_args_list[0].request)
 
+    def test_put_return_representation(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.update(['GET', 'PUT'])
+        root_resource.get.return_value = {'foo': 'bar'}
+        root_resource.put.return_value = None
+
+        response = savory_dispatch(
+            root_resource,
+            method='PUT',
+            body='{"foo": "bar"}',
+            META={'HTTP_PREFER': 'handling=lenient, return=representation'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, '{"foo": "bar"}')
+        self.assertEqual(response['Preference-Applied'], 'return=representation')
+        self.assertEqual(response['ETag'], get_sha1(mock_context(), {'foo': 'bar'}))
+
+    def test_put_too_large(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('PUT')
+
+        response = savory_dispatch(
+            root_resource,
+            method='PUT',
+            body='{"foo": "bar"}',
+            formatter=JSONFormatter(max_body_size=8)
+        )
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(root_resource.put.called)
+
+    def test_put_too_deep(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('PUT')
+
+        response = savory_dispatch(
+            root_resource,
+            method='PUT',
+            body='{"foo": [[1]]}',
+            formatter=JSONFormatter(max_depth=2)
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('deeper than 2', json.loads(response.content)['error'])
+
     def test_put_not_supported(self):
         root_resource = mock_resource(name='root')
 
@@ -649,6 +1335,29 @@ class ViewTest(unittest.TestCase):
         self.assertEqual(response['Location'], 'http://localhost/api/foo')
         self.assertIsNotNone(root_resource.post.call_args_list[0].request)
 
+    def test_post_return_representation(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('POST')
+
+        new_resource = mock_resource(name='new', resource_path='foo')
+        new_resource.allowed_methods.add('GET')
+        new_resource.get.return_value = {'foo': 'bar'}
+        new_resource.get_cache_validators = Mock(return_value=('version-1', None))
+        root_resource.post = Mock(return_value=new_resource)
+
+        response = savory_dispatch(
+            root_resource,
+            method='POST',
+            body='{"foo": "bar"}',
+            META={'HTTP_PREFER': 'return=representation'}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Location'], 'http://localhost/api/foo')
+        self.assertEqual(response.content, '{"foo": "bar"}')
+        self.assertEqual(response['ETag'], 'version-1')
+        self.assertEqual(new_resource.get.call_count, 1)
+
     def test_post_with_collision_one(self):
         root_resource = mock_resource(name='root')
         root_resource.allowed_methods.add('POST')
@@ -719,6 +1428,15 @@ class ViewTest(unittest.TestCase):
         self.assertTrue(root_resource.delete.called)
         self.assertIsNotNone(root_resource.delete.call_args_list[0].request)
 
+    def test_delete_content_success(self):
+        root_resource = mock_resource(name='root')
+        root_resource.allowed_methods.add('DELETE')
+        root_resource.delete.return_value = {'meta': {'affectedCount': 2}}
+
+        response = savory_dispatch(root_resource, method='DELETE')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {'meta': {'affectedCount': 2}})
+
     def test_delete_not_supported(self):
         root_resource = mock_resource(name='root')
 
@@ -13,6 +13,7 @@ def mock_context():
         ctx.pop()
 
     ctx = Mock(name='context', spec=['push', 'pop', 'peek'])
+    ctx.base_uri = 'uri://'
     ctx.formatter = JSONFormatter()
     ctx.build_resource_uri = lambda resource: 'uri://' + resource.resource_path
     ctx.target = target
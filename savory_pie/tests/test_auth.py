@@ -128,6 +128,52 @@ class URIAuthorizationAdapterTestCase(unittest.TestCase):
         self.assertEqual(source, ['uri1', 'uri2'])
         self.assertEqual(target, ['uri1', 'uri2', 'uri3'])
 
+    def _key_resource(self, key):
+        return Mock(key=key, resource_path='things/' + key)
+
+    def _build_resource_uri(self, resource):
+        return 'uri://' + resource.resource_path
+
+    def test_uri_auth_adapter_with_unchanged_relation(self):
+        field = Mock(spec=IterableField, name='field')
+        field.name = 'fieldName'
+        field._resource_class.side_effect = self._key_resource
+        field._compute_property.return_value = 'source_name'
+        field.get_iterable.return_value = ['1', '3', '2']
+
+        ctx = Mock(spec=['build_resource_uri'])
+        ctx.build_resource_uri.side_effect = self._build_resource_uri
+
+        target_obj = Mock(spec=['fieldName'])
+        target_obj.fieldName = Mock(spec=['all'])
+
+        source_dict = {'source_name': [{'resourceUri': 'uri://things/' + key} for key in ['2', '3', '1']]}
+
+        name, source, target = uri_auth_adapter(field, ctx, source_dict, target_obj)
+        self.assertEqual(source, ['uri://things/1', 'uri://things/2', 'uri://things/3'])
+        self.assertEqual(target, source)
+        # Only one URI is built, to find the collection the keys belong to
+        self.assertEqual(ctx.build_resource_uri.call_count, 1)
+
+    def test_uri_auth_adapter_with_uri_from_other_collection(self):
+        field = Mock(spec=URIListResourceField)
+        field.name = 'fieldName'
+        field._resource_class.side_effect = self._key_resource
+        field._compute_property.return_value = 'source_name'
+        field.get_iterable.return_value = ['1', '2']
+
+        ctx = Mock(spec=['build_resource_uri'])
+        ctx.build_resource_uri.side_effect = self._build_resource_uri
+
+        target_obj = Mock(spec=['fieldName'])
+        target_obj.fieldName = Mock(spec=['all'])
+
+        source_dict = {'source_name': ['uri://things/1', 'uri://others/2']}
+
+        name, source, target = uri_auth_adapter(field, ctx, source_dict, target_obj)
+        self.assertEqual(source, ['uri://others/2', 'uri://things/1'])
+        self.assertEqual(target, ['uri://things/1', 'uri://things/2'])
+
 
 class AuthorizationDecoratorTestCase(unittest.TestCase):
 
@@ -159,6 +205,23 @@ class AuthorizationDecoratorTestCase(unittest.TestCase):
         field.permission.is_write_authorized.assert_called_with('ctx', 'target_object', 'source', 'target')
         function.assert_called_with(field, 'ctx', 'source_dict', 'target_object')
 
+    def test_granted_permission_skips_adapter(self):
+        class GrantedPermission(object):
+            def has_permission(self, ctx):
+                return True
+
+            def is_write_authorized(self, ctx, target_obj, source, target):
+                raise AssertionError('should not be called')
+            is_write_authorized.granted_by_has_permission = True
+
+        adapter = Mock(side_effect=AssertionError('should not be called'))
+        function = Mock()
+        field = Mock(name='field', spec=['permission'])
+        field.permission = GrantedPermission()
+
+        authorization(adapter)(function)(field, 'ctx', 'source_dict', 'target_object')
+        function.assert_called_with(field, 'ctx', 'source_dict', 'target_object')
+
     def test_not_authorized(self):
         def adapter(*args):
             self.assertEqual((field, 'ctx', 'source_dict', 'target_object'), args)
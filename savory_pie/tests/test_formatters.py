@@ -2,8 +2,10 @@ import unittest
 import decimal
 import datetime
 import pytz
+from StringIO import StringIO
 
 import savory_pie.formatters
+from savory_pie.errors import RequestBodyError, RequestBodyTooLargeError
 
 
 class JSONToAPITest(unittest.TestCase):
@@ -185,3 +187,59 @@ class JSONToPython(unittest.TestCase):
                 self.fail(message + ', got ' + str(e.__class__))
             if succeeded_incorrectly:
                 self.fail(message)
+
+
+class ReadFromTest(unittest.TestCase):
+
+    def setUp(self):
+        self.json_formatter = savory_pie.formatters.JSONFormatter(max_depth=3, max_list_length=3)
+        # Small chunks split strings and escapes across reads
+        self.json_formatter.chunk_size = 2
+
+    def test_within_limits(self):
+        body = '{"a": [1, 2, {"b": "x\\"]"}], "c": "}"}'
+        self.assertEqual(self.json_formatter.read_from(StringIO(body)), {'a': [1, 2, {'b': 'x"]'}], 'c': '}'})
+
+    def test_list_too_long(self):
+        with self.assertRaises(RequestBodyError):
+            self.json_formatter.read_from(StringIO('[1, 2, 3, 4]'))
+
+    def test_too_deep(self):
+        with self.assertRaises(RequestBodyError):
+            self.json_formatter.read_from(StringIO('[[[[1]]]]'))
+
+    def test_malformed(self):
+        for body in ['{"a": [1', '{"a": 1}}', '{"a": }']:
+            with self.assertRaises(RequestBodyError):
+                self.json_formatter.read_from(StringIO(body))
+
+    def test_too_large(self):
+        json_formatter = savory_pie.formatters.JSONFormatter(max_body_size=5)
+        with self.assertRaises(RequestBodyTooLargeError) as cm:
+            json_formatter.read_from(StringIO('[1, 2, 3]'))
+        self.assertEqual(cm.exception.status, 413)
+
+    def test_malformed_content_length(self):
+        json_formatter = savory_pie.formatters.JSONFormatter(max_body_size=5)
+        request = StringIO('[1]')
+        request.META = {'CONTENT_LENGTH': 'five'}
+        with self.assertRaises(RequestBodyError) as cm:
+            json_formatter.read_from(request)
+        self.assertEqual(cm.exception.status, 400)
+
+    def test_iter_items(self):
+        body = '{"x": [9], "data": [{"m": "a,]"}, [1, 2], "s\\\\"], "z": 1}'
+        items = self.json_formatter.iter_items(StringIO(body), 'data')
+        self.assertEqual(next(items), {'m': 'a,]'})
+        self.assertEqual(list(items), [[1, 2], 's\\'])
+
+    def test_iter_items_trailing_comma(self):
+        for body in ['{"data": [1, ]}', '{"data": [,]}', '{"data": [1,, 2]}']:
+            with self.assertRaises(RequestBodyError):
+                list(self.json_formatter.iter_items(StringIO(body), 'data'))
+
+    def test_iter_items_top_level(self):
+        json_formatter = savory_pie.formatters.JSONFormatter()
+        self.assertEqual(list(json_formatter.iter_items(StringIO(' [ 1 , "2" ] '))), [1, '2'])
+        self.assertEqual(list(json_formatter.iter_items(StringIO('[]'))), [])
+        self.assertEqual(list(json_formatter.iter_items(StringIO('{"a": 1}'), 'data')), [])
@@ -30,11 +30,21 @@ class ResourceHelperTestCase(unittest.TestCase):
         with self.assertRaises(PreConditionError):
             resource = Mock(name='resource', allowed_methods=['PUT'])
             resource.get.return_value = {}
+            resource.get_cache_validators.return_value = None
             ctx = Mock(name='ctx')
             helpers.process_put_request(ctx, resource, {'data': 'data'}, expected_hash='123')
         resource.put.assert_called_with(ctx, {'data': 'data'})
         resource.get.assert_called_with(ctx, 'params')
 
+    def test_put_precondition_with_cache_validator(self):
+        resource = Mock(name='resource', allowed_methods=['PUT'])
+        resource.get.return_value = {}
+        resource.get_cache_validators.return_value = ('123', None)
+        resource.put.return_value = 'some value'
+        ctx = Mock(name='ctx')
+        result = helpers.process_put_request(ctx, resource, {'data': 'data'}, expected_hash='123')
+        self.assertEqual(result, 'some value')
+
     def test_put(self):
         resource = Mock(name='resource', allowed_methods=['PUT'])
         resource.get.return_value = {}
@@ -44,6 +54,21 @@ class ResourceHelperTestCase(unittest.TestCase):
         resource.put.assert_called_with(ctx, {'data': 'data'})
         self.assertEqual(result, 'some value')
 
+    def test_put_without_if_match_support(self):
+        resource = Mock(name='resource', allowed_methods=['PUT'], supports_if_match=False)
+        resource.put.return_value = 'some value'
+        ctx = Mock(name='ctx')
+        result = helpers.process_put_request(ctx, resource, {'data': 'data'})
+        resource.put.assert_called_with(ctx, {'data': 'data'})
+        self.assertFalse(resource.get.called)
+        self.assertEqual(result, 'some value')
+
+    def test_put_if_match_without_if_match_support(self):
+        resource = Mock(name='resource', allowed_methods=['PUT'], supports_if_match=False)
+        with self.assertRaises(PreConditionError):
+            helpers.process_put_request(Mock(name='ctx'), resource, {'data': 'data'}, expected_hash='123')
+        self.assertFalse(resource.put.called)
+
     def test_post_not_allowed(self):
         with self.assertRaises(MethodNotAllowedError):
             resource = Mock(name='resource', allowed_methods=['GET'])
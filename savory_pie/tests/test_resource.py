@@ -1,6 +1,6 @@
 import unittest
 import mock
-from savory_pie.resources import _ParamsImpl, EmptyParams
+from savory_pie.resources import _ParamsImpl, EmptyParams, Resource
 
 
 class EmptyParamsTestCase(unittest.TestCase):
@@ -73,3 +73,25 @@ class ParamsImplTestCase(unittest.TestCase):
     def test_get_list_of_not_found(self):
         params = _ParamsImpl({'key1': [1]})
         self.assertEqual(params.get_list_of('key2', str), [])
+
+
+class AllowedMethodsTestCase(unittest.TestCase):
+    def test_cached_per_class(self):
+        class ReadOnlyResource(Resource):
+            def get(self, ctx, params):
+                pass
+
+        resource = ReadOnlyResource()
+        self.assertEqual(resource.allowed_methods, {'GET'})
+        resource.allowed_methods.add('PUT')
+        self.assertEqual(ReadOnlyResource().allowed_methods, {'GET'})
+
+    def test_instance_methods(self):
+        class ReadOnlyResource(Resource):
+            def get(self, ctx, params):
+                pass
+
+        ReadOnlyResource().allowed_methods
+        resource = ReadOnlyResource()
+        resource.delete = lambda ctx: None
+        self.assertEqual(resource.allowed_methods, {'GET', 'DELETE'})